@@ -1,4 +1,5 @@
 from agents.env_wrapper.curriculum_env import CurriculumSimulatorEnv
+from agents.env_wrapper.vector_env import VectorSimulatorEnv
 
 from ray.rllib.env.apis.task_settable_env import TaskSettableEnv, TaskType
 from ray.rllib.env.env_context import EnvContext
@@ -48,6 +49,20 @@ def env_train_configs():
     }
 
 
+def vector_env_train_configs(num_envs: int = 256):
+    """Replace base/env train configs to step `num_envs` episodes per worker"""
+    return {
+        "env": VectorSimulatorEnv,
+        "num_envs_per_worker": 1,
+        "env_config": {
+            "num_weeks_train": -1,
+            "evaluation": False,
+            "num_envs": num_envs,
+        },
+        "env_task_fn": curriculum_fn,
+    }
+
+
 def env_evaluation_configs():
     return {
         "evaluation_interval": 1000,
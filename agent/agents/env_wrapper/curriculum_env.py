@@ -39,4 +39,10 @@ class CurriculumSimulatorEnv(TaskSettableEnv):
             "num_weeks_train": self.config.get("num_weeks_train"),
             "evaluation": self.config.get("evaluation"),
             "show_trade_result": self.config.get("show_trade_result"),
+            "ledger_dir": self.config.get("ledger_dir"),
+            "reuse_obs_buffer": self.config.get("reuse_obs_buffer", False),
+            "dataset_bundle": self.config.get("dataset_bundle"),
+            "profile": self.config.get("profile", False),
+            "obs_cache_mb": self.config.get("obs_cache_mb", 0),
+            "eval_weeks_only": self.config.get("eval_weeks_only", True),
         })
\ No newline at end of file
@@ -0,0 +1,268 @@
+import time
+import numpy
+import multiprocessing
+
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Tuple
+
+
+def _shared_arrays(buffer, num_envs: int, obs_dim: int, num_actions: int) -> Dict[str, numpy.ndarray]:
+    """(num_envs, ...) views over `buffer`, widest dtype first to keep them aligned"""
+    specs = [
+        ("rewards", (num_envs,), numpy.float64),
+        ("observations", (num_envs, obs_dim), numpy.float32),
+        ("action_mask", (num_envs, num_actions), numpy.int8),
+        ("dones", (num_envs,), numpy.bool_),
+    ]
+
+    arrays: Dict[str, numpy.ndarray] = {}
+    offset = 0
+    for name, shape, dtype in specs:
+        arrays[name] = numpy.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        offset += arrays[name].nbytes
+
+    return arrays
+
+
+def _shared_nbytes(num_envs: int, obs_dim: int, num_actions: int) -> int:
+    return num_envs * (8 + 4 * obs_dim + num_actions + 1)
+
+
+def _reset(env, task: float):
+    # CurriculumSimulatorEnv keeps its task, Simulator takes it on reset
+    if hasattr(env, "set_task"):
+        env.set_task(task)
+        return env.reset()
+
+    return env.reset(task)
+
+
+def _worker(remote, parent_remote, env_cls, env_config: Dict, num_envs: int, offset: int):
+    parent_remote.close()
+
+    envs = [env_cls(env_config) for _ in range(num_envs)]
+    remote.send((envs[0].observation_space, envs[0].action_space))
+
+    shm_name, total_envs, obs_dim, num_actions = remote.recv()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    arrays = {
+        name: array[offset:offset + num_envs]
+        for name, array in
+        _shared_arrays(shm.buf, total_envs, obs_dim, num_actions).items()
+    }
+    task = 0.1
+
+    def write_obs(i: int, obs: Dict[str, numpy.ndarray]):
+        arrays["observations"][i] = obs["observations"]
+        arrays["action_mask"][i] = obs["action_mask"]
+
+    try:
+        while True:
+            cmd, data = remote.recv()
+
+            if cmd == "step":
+                # Only non empty infos go through the pipe
+                infos: Dict[int, Dict] = {}
+                for i, env in enumerate(envs):
+                    obs, reward, done, info = env.step(data[i])
+                    if done:
+                        info = dict(info,
+                                    terminal_observation=obs["observations"].copy())
+                        obs = _reset(env, task)
+
+                    write_obs(i, obs)
+                    arrays["rewards"][i] = reward
+                    arrays["dones"][i] = done
+                    if info:
+                        infos[i] = info
+
+                remote.send(infos)
+
+            elif cmd == "reset":
+                for i, env in enumerate(envs):
+                    write_obs(i, _reset(env, task))
+                arrays["rewards"][:] = 0
+                arrays["dones"][:] = False
+                remote.send(None)
+
+            elif cmd == "set_task":
+                task = data
+                remote.send(None)
+
+            elif cmd == "close":
+                break
+
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Views must be released before the block is closed
+        arrays.clear()
+        shm.close()
+        remote.close()
+
+
+class SubprocVectorEnv:
+    """
+        `num_workers` processes with `envs_per_worker` environments each, for
+    stepping many Simulator episodes from one process without Ray.
+
+    `env_cls(env_config)` builds one environment, engine.Simulator and
+    CurriculumSimulatorEnv both work. Observations, masks, rewards and dones
+    are written by the workers into one shared memory block, only actions
+    and non empty infos go through the pipes. Finished episodes are reset
+    in the worker, their last observation is in info["terminal_observation"].
+    """
+
+    def __init__(self,
+                 env_cls,
+                 env_config: Dict,
+                 num_workers: int,
+                 envs_per_worker: int = 1,
+                 start_method: str = "spawn"):
+        self.num_workers = num_workers
+        self.envs_per_worker = envs_per_worker
+        self.num_envs = num_workers * envs_per_worker
+
+        self._remotes_, self._processes_ = [], []
+        self._shm_: shared_memory.SharedMemory = None
+        self._arrays_: Dict[str, numpy.ndarray] = {}
+        self._waiting_ = False
+        self._closed_ = False
+
+        ctx = multiprocessing.get_context(start_method)
+        try:
+            for k in range(num_workers):
+                remote, worker_remote = ctx.Pipe()
+                process = ctx.Process(
+                    target=_worker,
+                    args=(worker_remote, remote, env_cls, env_config,
+                          envs_per_worker, k * envs_per_worker),
+                    daemon=True,
+                )
+                process.start()
+                worker_remote.close()
+                self._remotes_.append(remote)
+                self._processes_.append(process)
+
+            # EOFError when a worker fails to build its environments
+            spaces = [remote.recv() for remote in self._remotes_]
+            self.observation_space, self.action_space = spaces[0]
+
+            obs_dim = self.observation_space["observations"].shape[0]
+            num_actions = self.action_space.n
+            self._shm_ = shared_memory.SharedMemory(
+                create=True, size=_shared_nbytes(self.num_envs, obs_dim, num_actions)
+            )
+            self._arrays_ = _shared_arrays(self._shm_.buf, self.num_envs, obs_dim, num_actions)
+            for remote in self._remotes_:
+                remote.send((self._shm_.name, self.num_envs, obs_dim, num_actions))
+
+        except BaseException:
+            self.close()
+            raise
+
+        self._num_steps_ = 0
+        self._start_time_ = time.perf_counter()
+
+    def _obs(self) -> Dict[str, numpy.ndarray]:
+        # Copies, the shared block is overwritten by the next step
+        return {
+            "action_mask": self._arrays_["action_mask"].copy(),
+            "observations": self._arrays_["observations"].copy(),
+        }
+
+    def _broadcast(self, cmd: str, data: Any = None):
+        for remote in self._remotes_:
+            remote.send((cmd, data))
+        for remote in self._remotes_:
+            remote.recv()
+
+    def reset(self) -> Dict[str, numpy.ndarray]:
+        self._broadcast("reset")
+        if self._num_steps_ == 0:
+            self._start_time_ = time.perf_counter()
+
+        return self._obs()
+
+    def set_task(self, task: float):
+        """Curriculum level used by the next resets of every environment"""
+        self._broadcast("set_task", task)
+
+    def step_async(self, actions: numpy.ndarray):
+        actions = numpy.asarray(actions).reshape(self.num_envs)
+
+        for k, remote in enumerate(self._remotes_):
+            start = k * self.envs_per_worker
+            remote.send(("step", actions[start:start + self.envs_per_worker]))
+        self._waiting_ = True
+
+    def step_wait(self) -> Tuple[Dict[str, numpy.ndarray], numpy.ndarray,
+                                 numpy.ndarray, List[Dict]]:
+        infos: List[Dict] = [{} for _ in range(self.num_envs)]
+        for k, remote in enumerate(self._remotes_):
+            for i, info in remote.recv().items():
+                infos[k * self.envs_per_worker + i] = info
+        self._waiting_ = False
+        self._num_steps_ += self.num_envs
+
+        return (
+            self._obs(),
+            self._arrays_["rewards"].copy(),
+            self._arrays_["dones"].copy(),
+            infos,
+        )
+
+    def step(self, actions: numpy.ndarray):
+        self.step_async(actions)
+        return self.step_wait()
+
+    @property
+    def steps_per_second(self) -> float:
+        """Environment steps of all workers per wall second since the first reset"""
+        elapsed = time.perf_counter() - self._start_time_
+        if self._num_steps_ == 0 or elapsed == 0:
+            return 0.0
+
+        return self._num_steps_ / elapsed
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "num_steps": self._num_steps_,
+            "elapsed_s": time.perf_counter() - self._start_time_,
+            "steps_per_second": self.steps_per_second,
+        }
+
+    def close(self):
+        if self._closed_:
+            return
+        self._closed_ = True
+
+        if self._shm_ is None:
+            # Construction failed, workers still alive wait for the shared block
+            for process in self._processes_:
+                process.terminate()
+        else:
+            for remote in self._remotes_:
+                try:
+                    if self._waiting_:
+                        remote.recv()
+                    remote.send(("close", None))
+                except (EOFError, OSError):
+                    # The worker already exited
+                    pass
+
+        for process in self._processes_:
+            process.join()
+        for remote in self._remotes_:
+            remote.close()
+
+        self._arrays_.clear()
+        if self._shm_ is not None:
+            self._shm_.close()
+            self._shm_.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,78 @@
+import numpy
+
+from ray.rllib.env.vector_env import VectorEnv
+from ray.rllib.env.env_context import EnvContext
+from ray.rllib.utils.annotations import override
+
+from market_simulator.vector_engine import VectorSimulator
+
+
+class VectorSimulatorEnv(VectorEnv):
+    """
+        Drive `env_config["num_envs"]` episodes from a single VectorSimulator,
+    use with "num_envs_per_worker": 1.
+    """
+
+    def __init__(self, config: EnvContext):
+        self.config = config
+
+        self.num_train_weeks_pct: float = 0.1 # 10%
+
+        self.vector_market = VectorSimulator({
+            "num_weeks_train": self.config.get("num_weeks_train"),
+            "evaluation": self.config.get("evaluation"),
+            "dataset_bundle": self.config.get("dataset_bundle"),
+        }, num_envs=self.config.get("num_envs", 64))
+
+        super().__init__(
+            observation_space=self.vector_market.observation_space,
+            action_space=self.vector_market.action_space,
+            num_envs=self.vector_market.num_envs,
+        )
+
+    def _split_obs(self, obs):
+        # Buffers of VectorSimulator are reused by the next step
+        action_mask = obs["action_mask"].copy()
+        observations = obs["observations"].copy()
+
+        return [
+            {"action_mask": action_mask[i], "observations": observations[i]}
+            for i in range(self.num_envs)
+        ]
+
+    @override(VectorEnv)
+    def vector_reset(self, *, seeds=None, options=None):
+        return self._split_obs(self.vector_market.reset(self.num_train_weeks_pct))
+
+    @override(VectorEnv)
+    def reset_at(self, index=None, *, seed=None, options=None):
+        if index is None:
+            index = 0
+
+        obs = self.vector_market.reset(self.num_train_weeks_pct, index=[index])
+        return {
+            "action_mask": obs["action_mask"][index].copy(),
+            "observations": obs["observations"][index].copy(),
+        }
+
+    @override(VectorEnv)
+    def vector_step(self, actions):
+        obs, rewards, dones, _ = self.vector_market.step(numpy.asarray(actions))
+
+        return (
+            self._split_obs(obs),
+            rewards.tolist(),
+            dones.tolist(),
+            [{} for _ in range(self.num_envs)],
+        )
+
+    @override(VectorEnv)
+    def get_sub_environments(self):
+        # Curriculum tasks are set on the whole vector env
+        return [self]
+
+    def get_task(self):
+        return self.num_train_weeks_pct
+
+    def set_task(self, task: float):
+        self.num_train_weeks_pct = task
@@ -1,13 +1,45 @@
 from absl import app, flags
 from agents import train
-from market_simulator.core.data_feed import fetch_data
+from market_simulator.core.data.dataset import TrainData
+from market_simulator.core.data_feed import fetch_data, feature_cache
+from market_simulator import sweep
 flags.DEFINE_string(
     "task",
     None,
     'Tasks: \n \
                         + Update data("update_data"). \n \
+                        + Materialize shared dataset("materialize_data"). \n \
+                        + Prebuild feature cache("build_feature_cache"). \n \
+                        + Invalidate feature cache("clear_feature_cache"). \n \
+                        + Static allocation sweep("sweep"). \n \
                         + Train agent("rebalance").',
 )
+flags.DEFINE_string(
+    "dataset_bundle",
+    None,
+    'Output directory of "materialize_data", pass the same path as '
+    '"dataset_bundle" in env_config to share it across workers.',
+)
+flags.DEFINE_string(
+    "sweep_output",
+    "sweep.parquet",
+    'Week x strategy returns of "sweep", the summary is written next to it.',
+)
+flags.DEFINE_integer(
+    "num_workers",
+    None,
+    'Processes of "sweep", all cores by default.',
+)
+flags.DEFINE_integer(
+    "download_workers",
+    4,
+    'Concurrent archive downloads of "update_data".',
+)
+flags.DEFINE_float(
+    "download_rate",
+    2.0,
+    'Archive requests per second of "update_data", shared by all symbols.',
+)
 
 FLAGS = flags.FLAGS
 
@@ -15,7 +47,25 @@ FLAGS = flags.FLAGS
 def main(_):
     input_task = FLAGS.task
     if input_task == "update_data":
-        fetch_data.update(symbols=['BTCUSDT', 'ETHUSDT'], with_zip=True)
+        fetch_data.update(symbols=['BTCUSDT', 'ETHUSDT'],
+                          with_zip=True,
+                          max_workers=FLAGS.download_workers,
+                          rate=FLAGS.download_rate)
+    elif input_task == "materialize_data":
+        train_data = TrainData(symbols=['BTCUSDT', 'ETHUSDT'])
+        train_data.materialize(FLAGS.dataset_bundle)
+    elif input_task == "build_feature_cache":
+        fetch_data.generate_dataset(symbols=['BTCUSDT', 'ETHUSDT'])
+        for cache_stats in feature_cache.build_stats():
+            print(cache_stats)
+    elif input_task == "clear_feature_cache":
+        feature_cache.invalidate()
+    elif input_task == "sweep":
+        _, summary = sweep.sweep(symbols=['BTCUSDT', 'ETHUSDT'],
+                                 output_path=FLAGS.sweep_output,
+                                 bundle_path=FLAGS.dataset_bundle,
+                                 num_workers=FLAGS.num_workers)
+        print(summary.to_string())
     elif input_task == "train":
         train.main()
 
@@ -0,0 +1,424 @@
+"""
+    Offline benchmarks of the market_simulator hot paths on synthetic klines.
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json --threshold 0.2
+
+Every metric is written as {"value", "unit", "higher_is_better"}. With
+--baseline, the run fails (exit code 1) when a metric is worse than the
+baseline by more than --threshold (relative).
+"""
+import os
+import sys
+import json
+import time
+import queue
+import zipfile
+import argparse
+import itertools
+import resource
+import tempfile
+import traceback
+import multiprocessing
+
+import numpy
+import pandas
+
+from typing import Callable, Dict, List
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT"]
+MERGE_SYMBOL = "MERGEUSDT"
+MERGE_INTERVAL_MS = 60 * 1000
+INTERVAL_MS = 4 * 3600 * 1000
+# Longest a benchmark may run in its subprocess, in seconds
+SUBPROCESS_TIMEOUT = 1800
+KLINE_COLUMNS = [
+    "open_time",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "close_time",
+    "quote_volume",
+    "count",
+    "taker_buy_volume",
+    "taker_buy_quote_volume",
+    "ignore",
+]
+
+
+def synthetic_klines(num_rows: int, start_price: float, seed: int) -> pandas.DataFrame:
+    rng = numpy.random.default_rng(seed)
+    open_time = 1609459200000 + numpy.arange(num_rows, dtype=numpy.int64) * INTERVAL_MS
+    close = start_price * numpy.exp(numpy.cumsum(rng.normal(0, 0.02, num_rows)))
+    open_price = numpy.r_[start_price, close[:-1]]
+
+    return pandas.DataFrame({
+        "open_time": open_time,
+        "open": open_price,
+        "high": numpy.maximum(open_price, close) * 1.01,
+        "low": numpy.minimum(open_price, close) * 0.99,
+        "close": close,
+        "volume": rng.random(num_rows) * 100,
+        "close_time": open_time + INTERVAL_MS - 1,
+        "quote_volume": rng.random(num_rows),
+        "count": rng.integers(1, 1000, num_rows),
+        "taker_buy_volume": rng.random(num_rows),
+        "taker_buy_quote_volume": rng.random(num_rows),
+        "ignore": 0,
+    }, columns=KLINE_COLUMNS)
+
+
+def write_fixture(klines_path: str, num_weeks: int):
+    from market_simulator.core.data_feed.kline_store import KlineStore
+
+    store = KlineStore(klines_path)
+    num_rows = num_weeks * 7 * 6
+    for seed, (symbol, start_price) in enumerate(zip(SYMBOLS, [30000.0, 1500.0])):
+        store.write(symbol, "4h", synthetic_klines(num_rows, start_price, seed), archived=True)
+
+
+def write_archive_fixture(klines_path: str, symbol: str, num_months: int):
+    """
+        Monthly zips of 1m klines as published by Binance, plus an API csv
+    overlapping the last day
+    """
+    month_starts = pandas.date_range("2021-01-01", periods=num_months + 1, freq="MS")
+    month_bounds = (month_starts.asi8 // 10 ** 6).tolist()
+
+    df = synthetic_klines((month_bounds[-1] - month_bounds[0]) // MERGE_INTERVAL_MS, 30000.0, 2)
+    df["open_time"] = month_bounds[0] + numpy.arange(len(df), dtype=numpy.int64) * MERGE_INTERVAL_MS
+    df["close_time"] = df["open_time"] + MERGE_INTERVAL_MS - 1
+
+    for month, start, end in zip(month_starts, month_bounds[:-1], month_bounds[1:]):
+        file_name = f"{symbol}-1m-{month:%Y-%m}"
+        month_df = df[(df["open_time"] >= start) & (df["open_time"] < end)]
+        with zipfile.ZipFile(f"{klines_path}/{file_name}.zip", "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(f"{file_name}.csv", month_df.to_csv(index=False, header=False))
+
+    df.iloc[-1440:].to_csv(f"{klines_path}/{symbol}1m-api.csv", header=False)
+
+
+def metric(value: float, unit: str, higher_is_better: bool) -> Dict:
+    return {"value": float(value), "unit": unit, "higher_is_better": higher_is_better}
+
+
+def timeit(func: Callable, repeat: int) -> List[float]:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    return durations
+
+
+def _in_subprocess(target: Callable, timeout: float = SUBPROCESS_TIMEOUT) -> Dict:
+    """
+        Run `target` in a fresh process so its peak RSS is its own. An
+    exception of `target` is raised again here with the child traceback, a
+    child that dies or runs past `timeout` seconds raises RuntimeError.
+    """
+    context = multiprocessing.get_context("spawn")
+    result_queue = context.Queue()
+    process = context.Process(target=_subprocess_main, args=(target, result_queue))
+    process.start()
+    deadline = time.monotonic() + timeout
+
+    try:
+        while True:
+            try:
+                result = result_queue.get(timeout=1)
+                break
+
+            except queue.Empty:
+                # Killed by a signal or the OOM killer, the child never puts a result
+                if process.exitcode is not None and result_queue.empty():
+                    raise RuntimeError(
+                        f"{target.__name__} exited with code {process.exitcode} without a result"
+                    )
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{target.__name__} did not finish within {timeout:.0f}s")
+
+    finally:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    if "error" in result:
+        raise RuntimeError(f"{target.__name__} failed in its subprocess:\n{result['error']}")
+
+    return result
+
+
+def _subprocess_main(target: Callable, result_queue):
+    try:
+        wall_time = target()
+    except BaseException:
+        result_queue.put({"error": traceback.format_exc()})
+        raise
+
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result_queue.put({"wall_time": wall_time, "peak_rss_mb": peak_rss_kb / 1024})
+
+
+def _build_dataset() -> float:
+    from market_simulator.core.data_feed import fetch_data
+
+    start = time.perf_counter()
+    fetch_data.generate_dataset(SYMBOLS, use_cache=False)
+    return time.perf_counter() - start
+
+
+def _build_train_data() -> float:
+    from market_simulator.core.data.dataset import TrainData
+
+    start = time.perf_counter()
+    TrainData(symbols=SYMBOLS)
+    return time.perf_counter() - start
+
+
+def _merge_klines() -> float:
+    from market_simulator.core.data_feed.binance.kline import KLineDataFeed
+
+    return KLineDataFeed(MERGE_SYMBOL, "1m")._merge_data()["seconds"]
+
+
+def bench_merge(num_months: int) -> Dict[str, Dict]:
+    from market_simulator.core.data_feed.binance.constants import KLINES_PATH
+
+    write_archive_fixture(KLINES_PATH, MERGE_SYMBOL, num_months)
+    merge = _in_subprocess(_merge_klines)
+
+    return {
+        "kline.merge.wall_time": metric(merge["wall_time"], "s", False),
+        "kline.merge.peak_rss": metric(merge["peak_rss_mb"], "MB", False),
+    }
+
+
+def _build_eval_train_data() -> float:
+    from market_simulator.core.data.dataset import TrainData
+
+    start = time.perf_counter()
+    TrainData(symbols=SYMBOLS, weeks=(-3, -1))
+    return time.perf_counter() - start
+
+
+def bench_dataset() -> Dict[str, Dict]:
+    from market_simulator.core.data_feed import feature_cache
+
+    results = {}
+
+    dataset = _in_subprocess(_build_dataset)
+    results["generate_dataset.wall_time"] = metric(dataset["wall_time"], "s", False)
+    results["generate_dataset.peak_rss"] = metric(dataset["peak_rss_mb"], "MB", False)
+
+    feature_cache.invalidate()
+    cold = _in_subprocess(_build_train_data)
+    results["train_data_init.cold.wall_time"] = metric(cold["wall_time"], "s", False)
+    results["train_data_init.cold.peak_rss"] = metric(cold["peak_rss_mb"], "MB", False)
+
+    warm = _in_subprocess(_build_train_data)
+    results["train_data_init.warm.wall_time"] = metric(warm["wall_time"], "s", False)
+    results["train_data_init.warm.peak_rss"] = metric(warm["peak_rss_mb"], "MB", False)
+
+    eval_weeks = _in_subprocess(_build_eval_train_data)
+    results["train_data_init.eval_weeks.wall_time"] = metric(eval_weeks["wall_time"], "s", False)
+    results["train_data_init.eval_weeks.peak_rss"] = metric(eval_weeks["peak_rss_mb"], "MB", False)
+
+    return results
+
+
+def bench_simulator(num_steps: int, num_resets: int) -> Dict[str, Dict]:
+    from market_simulator.engine import Simulator
+
+    simulator = Simulator({
+        "num_weeks_train": -1,
+        "evaluation": False,
+        "show_trade_result": False,
+    })
+    rng = numpy.random.default_rng(0)
+
+    reset_latency = timeit(lambda: simulator.reset(1.0), num_resets)
+
+    obs = simulator.reset(1.0)
+    done = False
+    start = time.perf_counter()
+    for _ in range(num_steps):
+        if done:
+            obs = simulator.reset(1.0)
+        action = rng.choice(numpy.flatnonzero(obs["action_mask"]))
+        obs, _, done, _ = simulator.step(action)
+    step_time = time.perf_counter() - start
+
+    portfolio_manager = simulator._portfolio_manager_
+
+    def avaiable_action():
+        portfolio_manager._orders_cache_ = None
+        portfolio_manager.avaiable_action(14)
+
+    # The same allocation twice in a row is the HOLD early-out, alternate two
+    # so that every call rebalances both assets
+    next_action_id = itertools.cycle([14, 23]).__next__
+
+    def execute_order():
+        portfolio_manager.execute_order(next_action_id())
+
+    avaiable_action_time = timeit(avaiable_action, num_steps)
+    execute_order_time = timeit(execute_order, num_steps)
+
+    return {
+        "simulator.step.throughput": metric(num_steps / step_time, "steps/s", True),
+        "simulator.reset.p50": metric(numpy.median(reset_latency) * 1e6, "us", False),
+        "portfolio.avaiable_action.p50":
+            metric(numpy.median(avaiable_action_time) * 1e6, "us", False),
+        "portfolio.execute_order.p50":
+            metric(numpy.median(execute_order_time) * 1e6, "us", False),
+    }
+
+
+def bench_backtest(num_weeks: int) -> Dict[str, Dict]:
+    from market_simulator.engine import Simulator
+    from market_simulator.backtest import Backtester
+
+    simulator = Simulator({
+        "num_weeks_train": 2,
+        "evaluation": True,
+        "show_trade_result": False,
+        "eval_weeks_only": False,
+    })
+    train_data = simulator._price_manager_.train_data
+    backtester = Backtester(train_data)
+    rng = numpy.random.default_rng(0)
+
+    step_time = backtest_time = 0.0
+    for week_id in range(2, min(num_weeks, train_data.total_week_id)):
+        actions = rng.integers(0, 28, 7 * 6 + 1)
+
+        # Evaluation episodes replay week `num_weeks_train`
+        simulator._price_manager_.num_weeks_train = week_id
+        simulator.reset(1.0)
+        done, k = False, 0
+        start = time.perf_counter()
+        while not done:
+            _, _, done, _ = simulator.step(actions[k])
+            k += 1
+        step_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        backtester.run(week_id, actions)
+        backtest_time += time.perf_counter() - start
+
+    return {
+        "backtest.speedup": metric(step_time / backtest_time, "x", True),
+    }
+
+
+def bench_greeks(rows: List[int]) -> Dict[str, Dict]:
+    from market_simulator.core.data_feed.transform import hedge
+
+    results = {}
+    for num_rows in rows:
+        close_1 = synthetic_klines(num_rows, 30000.0, 0)["close"]
+        close_2 = synthetic_klines(num_rows, 1500.0, 1)["close"]
+        wall_time = min(timeit(lambda: hedge.calculate_greeks(close_1, close_2), 3))
+        results[f"hedge.calculate_greeks.{num_rows}_rows"] = metric(wall_time, "s", False)
+
+    return results
+
+
+def bench_calendar(rows: List[int]) -> Dict[str, Dict]:
+    from market_simulator.core.data_feed.transform import trading_period
+
+    results = {}
+    for num_rows in rows:
+        # 1m candles, the interval where the calendar features dominate generate_dataset
+        open_time = pandas.Series(
+            1609459200000 + numpy.arange(num_rows, dtype=numpy.int64) * 60 * 1000
+        )
+        week_id_time = min(timeit(lambda: trading_period.extract_week_id(open_time), 3))
+        period_time = min(timeit(lambda: trading_period.extract_period(open_time), 3))
+        results[f"trading_period.extract_week_id.{num_rows}_rows"] = \
+            metric(week_id_time, "s", False)
+        results[f"trading_period.extract_period.{num_rows}_rows"] = \
+            metric(period_time, "s", False)
+
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float):
+    """Names of the metrics worse than `baseline` by more than `threshold`"""
+    regressions = []
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+
+        base_value = baseline[name]["value"]
+        if current["higher_is_better"]:
+            change = (base_value - current["value"]) / base_value
+        else:
+            change = (current["value"] - base_value) / base_value
+
+        status = "REGRESSION" if change > threshold else "ok"
+        print(f"{name}: {base_value:.4g} -> {current['value']:.4g} "
+              f"{current['unit']} ({-change:+.1%}) {status}")
+
+        if change > threshold:
+            regressions.append(name)
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed relative regression, default 0.2")
+    parser.add_argument("--weeks", type=int, default=100,
+                        help="Weeks of synthetic 4h klines")
+    parser.add_argument("--steps", type=int, default=5000)
+    parser.add_argument("--resets", type=int, default=200)
+    parser.add_argument("--greeks-rows", default="1000,2000,5000")
+    parser.add_argument("--calendar-rows", default="1000000,5000000")
+    parser.add_argument("--merge-months", type=int, default=6,
+                        help="Monthly archives of 1m klines merged by kline.merge")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Must be set before market_simulator is imported
+        os.environ["MARKET_SIMULATOR_CACHE"] = cache_dir
+        from market_simulator.core.data_feed.binance.constants import KLINES_PATH
+
+        write_fixture(KLINES_PATH, args.weeks)
+
+        results = {}
+        results.update(bench_dataset())
+        results.update(bench_merge(args.merge_months))
+        results.update(bench_simulator(args.steps, args.resets))
+        results.update(bench_backtest(args.weeks))
+        results.update(bench_greeks([int(r) for r in args.greeks_rows.split(",")]))
+        results.update(bench_calendar([int(r) for r in args.calendar_rows.split(",")]))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
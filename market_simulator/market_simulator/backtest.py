@@ -0,0 +1,294 @@
+import cython
+import numpy
+
+from market_simulator.core.data.dataset import TrainData
+from market_simulator.constant import ACTION_ALLOCATION, ACTION_TYPES
+from market_simulator.common import round_size
+from cython.cimports.libc import math
+
+HOLD: cython.int = ACTION_TYPES.index("HOLD")
+OPEN_NEW: cython.int = ACTION_TYPES.index("OPEN_NEW")
+INCREASE: cython.int = ACTION_TYPES.index("INCREASE")
+DECREASE: cython.int = ACTION_TYPES.index("DECREASE")
+CLOSE_OPEN_NEW: cython.int = ACTION_TYPES.index("CLOSE_OPEN_NEW")
+
+@cython.dataclasses.dataclass
+@cython.cclass
+class BacktestResult:
+        """Per-step results, one row per Simulator.step"""
+        trading_time: numpy.ndarray
+        actions: numpy.ndarray
+        actions_type: numpy.ndarray
+        trades_return: numpy.ndarray
+        assets_pnl: numpy.ndarray
+        portfolio_value: numpy.ndarray
+        pnl: numpy.ndarray
+        rewards: numpy.ndarray
+        done: cython.int
+
+
+@cython.cfunc
+@cython.inline
+def _round_to_step(size: cython.double,
+                   step_size: cython.double,
+                   min_order_size: cython.double) -> cython.double:
+    # round_size.round_to_step of one value, ActionMaskEngine sizes orders in double
+    _size_: cython.double = size - math.fmod(size, step_size)
+    if math.fabs(_size_) > min_order_size:
+        return _size_
+    return 0
+
+
+@cython.cfunc
+@cython.inline
+def _round_step(size: cython.float,
+                step_size: cython.float,
+                min_order_size: cython.float) -> cython.float:
+    # round_size.size with the step sizes of one symbol
+    _size_: cython.float = size - math.fmod(size, step_size)
+    if math.fabsf(_size_) > min_order_size:
+        return _size_
+    return 0
+
+
+@cython.cfunc
+@cython.inline
+def _round_number(val: cython.float) -> cython.double:
+    # round_size.round_number, the compiled module returns the double unrounded to float
+    return math.round(val * 100000) / 100000
+
+
+class Backtester:
+    """
+        Replay a sequence of actions on the evaluation episode of a week
+    without a Simulator: same sizing, rounding, fees, Asset.update accounting,
+    rewards and terminal bonuses as Simulator.step, computed by a typed loop
+    over TrainData's price arrays. Compiled, it keeps the float and double
+    precision of each Simulator value and gives the same results.
+    """
+
+    def __init__(self, train_data: TrainData, initial_equity: cython.float = 1500):
+        self.train_data: TrainData = train_data
+        self.symbols = train_data.symbols
+        self.initial_equity: cython.float = initial_equity
+
+        self._allocation_ = numpy.ascontiguousarray(ACTION_ALLOCATION, dtype=numpy.float64)
+        # tick_size, tick_min_order_size, step_size, step_min_order_size rows
+        self._step_sizes_ = numpy.array(
+            round_size.step_sizes(self.symbols, 1) + round_size.step_sizes(self.symbols, 0),
+            dtype=numpy.float64,
+        )
+
+    def run(self, week_id: cython.int, actions: numpy.ndarray) -> BacktestResult:
+        """
+            One row per step until the episode ends or `actions` is
+        exhausted, `done` tells which one happened.
+        """
+        return _backtest(self, week_id, numpy.ascontiguousarray(actions, dtype=numpy.int64))
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _backtest(backtester: Backtester,
+              week_id: cython.int,
+              actions: numpy.ndarray) -> BacktestResult:
+    trading_times, target_prices = backtester.train_data.get_week_prices(week_id)
+    performance: cython.double = backtester.train_data.get_week_performance(week_id)
+    initial_equity: cython.float = backtester.initial_equity
+    num_assets: cython.int = len(backtester.symbols)
+    num_states: cython.int = len(target_prices)
+    max_steps: cython.int = min(len(actions), num_states)
+    num_actions: cython.int = len(backtester._allocation_)
+
+    # Every typed view costs a buffer acquisition, related arrays share one
+    allocation: cython.double[:, :] = backtester._allocation_
+    step_sizes: cython.double[:, :] = backtester._step_sizes_
+    tick_size: cython.double[:] = step_sizes[0]
+    tick_min_order_size: cython.double[:] = step_sizes[1]
+    step_size: cython.double[:] = step_sizes[2]
+    step_min_order_size: cython.double[:] = step_sizes[3]
+    prices: cython.double[:, :] = target_prices
+    _actions_: cython.longlong[:] = actions
+
+    # Asset state, the Asset fields are floats
+    state: cython.double[:, :] = numpy.zeros((4, num_assets), dtype=numpy.float64)
+    sizes: cython.double[:] = state[0]
+    avg_prices: cython.double[:] = state[1]
+    realized_pnl: cython.double[:] = state[2]
+    orders_size: cython.double[:] = state[3]
+
+    # Results, the first k steps are written and returned
+    out_actions_type_arr = numpy.empty((max_steps, num_assets), dtype=numpy.int8)
+    out_per_asset_arr = numpy.empty((2, max_steps, num_assets), dtype=numpy.float64)
+    out_per_step_arr = numpy.empty((3, max_steps), dtype=numpy.float64)
+    out_actions_type: cython.schar[:, :] = out_actions_type_arr
+    out_per_asset: cython.double[:, :, :] = out_per_asset_arr
+    out_per_step: cython.double[:, :] = out_per_step_arr
+    out_trades_return: cython.double[:, :] = out_per_asset[0]
+    out_assets_pnl: cython.double[:, :] = out_per_asset[1]
+    out_portfolio_value: cython.double[:] = out_per_step[0]
+    out_pnl: cython.double[:] = out_per_step[1]
+    out_rewards: cython.double[:] = out_per_step[2]
+
+    # Portfolio value at the prices of the previous execution, used for sizing
+    previous_portfolio_value: cython.float = initial_equity
+    compelete: cython.int = 0
+    done: cython.int = 0
+    k: cython.int = 0
+    i: cython.int
+    action: cython.longlong
+    can_rebalance: cython.int
+    order_value: cython.double
+    order_size: cython.double
+    portfolio_value: cython.float
+    total_trades_return: cython.double
+    total_assets_pnl: cython.double
+    price: cython.float
+    new_size: cython.float
+    size: cython.float
+    avg_price: cython.float
+    realized: cython.float
+    size_change: cython.float
+    fee: cython.float
+    total_value: cython.float
+    trade_return: cython.float
+    unrealized_pnl: cython.float
+    total_pnl: cython.float
+    asset_pnl: cython.double
+    rounded_trade_return: cython.double
+    action_type: cython.int
+    reward: cython.float
+    pnl_value: cython.double
+
+    # The float locals and the casts to double follow the C and Python
+    # arithmetic of the compiled Simulator, Asset property reads are Python floats
+    while k < max_steps:
+        action = _actions_[k]
+        if action < 0 or action >= num_actions:
+            raise ValueError(f"Action {action} at step {k} is not in [0, {num_actions})")
+
+        # PortfolioManager.avaiable_action
+        can_rebalance = 1
+        for i in range(num_assets):
+            order_value = _round_to_step(
+                allocation[action, i] * previous_portfolio_value,
+                tick_size[i],
+                tick_min_order_size[i],
+            )
+            order_size = order_value / prices[k, i]
+            if _round_to_step(order_size - sizes[i], step_size[i],
+                              step_min_order_size[i]) == 0:
+                can_rebalance = 0
+            orders_size[i] = _round_to_step(order_size, step_size[i],
+                                            step_min_order_size[i])
+
+        # Asset.update
+        total_trades_return = 0
+        total_assets_pnl = 0
+        for i in range(num_assets):
+            new_size = orders_size[i] if can_rebalance else 0
+            price = prices[k, i]
+            size = sizes[i]
+            avg_price = avg_prices[i]
+            realized = realized_pnl[i]
+            trade_return = 0
+            action_type = HOLD
+
+            if new_size != 0:
+                size_change = _round_step(
+                    new_size - size, step_size[i], step_min_order_size[i]
+                )
+                if size_change != 0:
+                    fee = (math.fabsf(size_change) * price) * 0.0005
+                    trade_return = -fee
+
+                    if size == 0:
+                        action_type = OPEN_NEW
+                        avg_price = price
+                    elif new_size * size < 0:
+                        action_type = CLOSE_OPEN_NEW
+                        trade_return = trade_return + \
+                            (cython.cast(cython.double, price) - avg_price) * size
+                        realized += trade_return
+                        avg_price = price
+                    elif size_change * new_size > 0:
+                        action_type = INCREASE
+                        total_value = cython.cast(cython.double, size) * avg_price + \
+                            size_change * price
+                        avg_price = total_value / (cython.cast(cython.double, size) + size_change)
+                    else:
+                        action_type = DECREASE
+                        trade_return = trade_return + \
+                            (cython.cast(cython.double, price) - avg_price) * new_size
+                        realized += trade_return
+
+                    size = new_size
+
+            sizes[i] = size
+            avg_prices[i] = avg_price
+            realized_pnl[i] = realized
+
+            # PortfolioInfo with the asset prices of this execution
+            unrealized_pnl = 0
+            if price > 0:
+                unrealized_pnl = (cython.cast(cython.double, price) - avg_price) * size
+            total_pnl = cython.cast(cython.double, realized) + unrealized_pnl
+            asset_pnl = _round_number(total_pnl)
+            rounded_trade_return = _round_number(trade_return)
+
+            total_trades_return += rounded_trade_return
+            total_assets_pnl += asset_pnl
+            out_actions_type[k, i] = action_type
+            out_trades_return[k, i] = rounded_trade_return
+            out_assets_pnl[k, i] = asset_pnl
+
+        portfolio_value = cython.cast(cython.double, initial_equity) + total_assets_pnl
+
+        # Simulator._reward_scheme
+        reward = 0
+        if total_assets_pnl < 0:
+            reward -= 0.004
+        else:
+            reward += 0.004
+
+        if total_trades_return < -0.001:
+            reward -= 0.05
+        elif total_trades_return > 0.001:
+            reward += 0.05
+
+        # Simulator.portfolio_return
+        pnl_value = cython.cast(cython.double, portfolio_value) - initial_equity
+        if compelete:
+            if pnl_value / initial_equity > performance:
+                reward += 2
+            else:
+                reward -= 2
+
+            if pnl_value > 20:
+                reward += 4
+            else:
+                reward -= 4
+
+        out_portfolio_value[k] = portfolio_value
+        out_pnl[k] = pnl_value
+        out_rewards[k] = reward
+        k += 1
+
+        if compelete:
+            done = 1
+            break
+
+        previous_portfolio_value = portfolio_value
+        compelete = k == num_states - 1 or pnl_value < -30
+
+    return BacktestResult(
+        trading_time=trading_times[:k].copy(),
+        actions=actions[:k].copy(),
+        actions_type=out_actions_type_arr[:k],
+        trades_return=out_per_asset_arr[0, :k],
+        assets_pnl=out_per_asset_arr[1, :k],
+        portfolio_value=out_per_step_arr[0, :k],
+        pnl=out_per_step_arr[1, :k],
+        rewards=out_per_step_arr[2, :k],
+        done=done,
+    )
@@ -0,0 +1,58 @@
+import cython
+import numpy
+
+
+class HistoryBuffer:
+    """
+        Append-only (rows, width) buffer with a write cursor.
+    Storage is preallocated and only grows (doubling) when an episode
+    outlives `capacity`, so `clear` and steady-state `append` never allocate.
+    """
+
+    def __init__(self, width: cython.int, capacity: cython.int, dtype=numpy.float32):
+        self.width: cython.int = width
+        self._buffer_: numpy.ndarray = numpy.zeros((capacity, width), dtype=dtype)
+        self._cursor_: cython.int = 0
+
+    def _grow(self):
+        _buffer_ = numpy.zeros((2 * len(self._buffer_), self.width),
+                               dtype=self._buffer_.dtype)
+        _buffer_[:self._cursor_] = self._buffer_[:self._cursor_]
+        self._buffer_ = _buffer_
+
+    def append(self, values):
+        if self._cursor_ == len(self._buffer_):
+            self._grow()
+
+        self._buffer_[self._cursor_] = values
+        self._cursor_ += 1
+
+    def clear(self):
+        self._cursor_ = 0
+
+    def rewind(self, length: cython.int):
+        """Drop the rows after `length`"""
+        self._cursor_ = min(length, self._cursor_)
+
+    def snapshot(self) -> bytes:
+        return self.values.tobytes()
+
+    def restore(self, data: bytes):
+        rows = numpy.frombuffer(data, dtype=self._buffer_.dtype).reshape(-1, self.width)
+        while len(rows) > len(self._buffer_):
+            self._grow()
+
+        self._buffer_[:len(rows)] = rows
+        self._cursor_ = len(rows)
+
+    @property
+    def values(self) -> numpy.ndarray:
+        """View of the rows written so far"""
+        return self._buffer_[:self._cursor_]
+
+    @property
+    def capacity(self) -> cython.int:
+        return len(self._buffer_)
+
+    def __len__(self) -> cython.int:
+        return self._cursor_
@@ -0,0 +1,61 @@
+import cython
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+
+class ByteLRUCache:
+    """
+        Least recently used cache bounded by the total `nbytes` given with
+    each entry. An entry larger than `max_bytes` is not stored.
+    """
+
+    def __init__(self, max_bytes: cython.longlong):
+        self.max_bytes: cython.longlong = max_bytes
+        self._entries_: OrderedDict = OrderedDict()
+        self._bytes_: cython.longlong = 0
+
+        self.hits: cython.longlong = 0
+        self.misses: cython.longlong = 0
+        self.evictions: cython.longlong = 0
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries_.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries_.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, nbytes: cython.longlong):
+        if nbytes > self.max_bytes:
+            return
+
+        if key in self._entries_:
+            self._bytes_ -= self._entries_.pop(key)[1]
+
+        self._entries_[key] = (value, nbytes)
+        self._bytes_ += nbytes
+
+        while self._bytes_ > self.max_bytes:
+            _, (_, evicted_nbytes) = self._entries_.popitem(last=False)
+            self._bytes_ -= evicted_nbytes
+            self.evictions += 1
+
+    def clear(self):
+        self._entries_.clear()
+        self._bytes_ = 0
+
+    def __len__(self) -> cython.int:
+        return len(self._entries_)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries_),
+            "bytes": self._bytes_,
+        }
@@ -0,0 +1,64 @@
+import time
+import cython
+import numpy
+
+from typing import Callable, Dict
+
+
+class PhaseProfiler:
+    """
+        Wall time per named phase. `wrap` returns a timed version of a
+    function, so a disabled profiler costs nothing: the plain function is
+    simply never replaced. The last `window` samples of each phase are kept
+    for percentiles.
+    """
+
+    def __init__(self, window: cython.int = 4096):
+        self.window: cython.int = window
+        self._counts_: Dict[str, int] = {}
+        self._totals_: Dict[str, float] = {}
+        self._samples_: Dict[str, numpy.ndarray] = {}
+
+    def record(self, phase: str, seconds: cython.double):
+        count: cython.int = self._counts_.get(phase, 0)
+        if count == 0:
+            self._totals_[phase] = 0
+            self._samples_[phase] = numpy.zeros(self.window, dtype=numpy.float64)
+
+        self._samples_[phase][count % self.window] = seconds
+        self._totals_[phase] += seconds
+        self._counts_[phase] = count + 1
+
+    def wrap(self, phase: str, func: Callable) -> Callable:
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(phase, perf_counter() - start)
+
+        return timed
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Count, total seconds and mean/p50/p90/p99 in microseconds per phase"""
+        phase_stats = {}
+        for phase, count in self._counts_.items():
+            samples = self._samples_[phase][:min(count, self.window)] * 1e6
+            p50, p90, p99 = numpy.percentile(samples, [50, 90, 99])
+            phase_stats[phase] = {
+                "count": count,
+                "total_s": self._totals_[phase],
+                "mean_us": self._totals_[phase] * 1e6 / count,
+                "p50_us": float(p50),
+                "p90_us": float(p90),
+                "p99_us": float(p99),
+            }
+
+        return phase_stats
+
+    def reset(self):
+        self._counts_.clear()
+        self._totals_.clear()
+        self._samples_.clear()
@@ -1,7 +1,9 @@
 import cython
+import numpy
 from cython.cimports.libc import math
 
 from decimal import Decimal
+from typing import List
 
 
 STEP_SIZE = {
@@ -47,3 +49,37 @@ def size(
         return _size_
     else:
         return 0
+
+def round_numbers(val: numpy.ndarray) -> numpy.ndarray:
+    """Vectorized `round_number`, rounding half away from zero like C round"""
+    return numpy.trunc(val * 100000 + numpy.copysign(0.5, val)) / 100000
+
+def step_sizes(symbols: List[str], is_tick: cython.int):
+    """(step_size, min_order_size) arrays following `symbols`"""
+
+    if is_tick == 1:
+        step_size = numpy.array([TICK_SIZE[s] for s in symbols])
+    else:
+        step_size = numpy.array([STEP_SIZE[s] for s in symbols])
+
+    min_order_size = numpy.array([MIN_ORDER_SIZE[s] for s in symbols])
+
+    return step_size, min_order_size
+
+def round_to_step(
+        size: numpy.ndarray,
+        step_size: numpy.ndarray,
+        min_order_size: numpy.ndarray) -> numpy.ndarray:
+    """Vectorized `size` with precomputed `step_sizes`"""
+
+    _size_ = size - numpy.fmod(size, step_size)
+    return numpy.where(numpy.abs(_size_) > min_order_size, _size_, 0)
+
+def sizes(
+        symbols: List[str],
+        size: numpy.ndarray,
+        is_tick: cython.int) -> numpy.ndarray:
+    """Vectorized `size`, the last axis of `size` follows `symbols`"""
+
+    step_size, min_order_size = step_sizes(symbols, is_tick)
+    return round_to_step(size, step_size, min_order_size)
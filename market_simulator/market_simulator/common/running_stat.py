@@ -0,0 +1,139 @@
+import cython
+import numpy
+
+
+class RunningZScore:
+    """
+        Online z-score of the latest sample against every sample seen so far.
+    Running mean and variance (ddof=0) are updated per column with Welford's
+    algorithm, so
+
+                RunningZScore.update(x_t) == zscore(X[:t + 1])[-1]
+
+    is computed in O(1) per step instead of rescanning the history.
+    Constant columns produce 0, like `numpy.nan_to_num(zscore(...))`.
+    """
+
+    def __init__(self, size: cython.int):
+        self.size: cython.int = size
+
+        # Internal state: Must be reset after every episode
+        self._count_: cython.int = 0
+        self._mean_: numpy.ndarray = numpy.zeros(size, dtype=numpy.float64)
+        self._m2_: numpy.ndarray = numpy.zeros(size, dtype=numpy.float64)
+        self._zscore_: numpy.ndarray = numpy.zeros(size, dtype=numpy.float64)
+
+    def update(self, values) -> numpy.ndarray:
+        _values_: numpy.ndarray = numpy.asarray(values, dtype=numpy.float64)
+
+        self._count_ += 1
+        delta: numpy.ndarray = _values_ - self._mean_
+        self._mean_ += delta / self._count_
+        self._m2_ += delta * (_values_ - self._mean_)
+
+        std: numpy.ndarray = numpy.sqrt(self._m2_ / self._count_)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            numpy.divide(_values_ - self._mean_, std, out=self._zscore_)
+
+        # Constant column
+        self._zscore_[self._m2_ == 0] = 0
+        numpy.nan_to_num(self._zscore_, copy=False)
+
+        return self._zscore_
+
+    @property
+    def zscore(self) -> numpy.ndarray:
+        return self._zscore_
+
+    @property
+    def count(self) -> cython.int:
+        return self._count_
+
+    def snapshot(self) -> tuple:
+        return (
+            self._count_,
+            tuple(self._mean_.tolist()),
+            tuple(self._m2_.tolist()),
+            tuple(self._zscore_.tolist()),
+        )
+
+    def restore(self, state: tuple):
+        self._count_ = state[0]
+        self._mean_[:] = state[1]
+        self._m2_[:] = state[2]
+        self._zscore_[:] = state[3]
+
+    def reset(self):
+        self._count_ = 0
+        self._mean_.fill(0)
+        self._m2_.fill(0)
+        self._zscore_.fill(0)
+
+
+def merge_moments(
+    count_a,
+    mean_a: numpy.ndarray,
+    m2_a: numpy.ndarray,
+    count_b,
+    mean_b: numpy.ndarray,
+    m2_b: numpy.ndarray,
+):
+    """
+        Combine (count, mean, M2) of two disjoint samples, see Chan et al.
+    parallel variance. M2 is the sum of squared deviations from the mean.
+    Counts are Python ints, or (N, 1) arrays to merge N pairs of samples at
+    once, so they are left untyped.
+    """
+
+    count = count_a + count_b
+    delta: numpy.ndarray = mean_b - mean_a
+    mean: numpy.ndarray = mean_a + delta * (count_b / count)
+    m2: numpy.ndarray = m2_a + m2_b + delta * delta * (count_a * count_b / count)
+
+    return count, mean, m2
+
+
+class BatchRunningZScore:
+    """RunningZScore for N independent streams, samples are (N, size) rows"""
+
+    def __init__(self, num_envs: cython.int, size: cython.int):
+        self.num_envs: cython.int = num_envs
+        self.size: cython.int = size
+
+        # Internal state: Must be reset after every episode
+        self._count_: numpy.ndarray = numpy.zeros((num_envs, 1), dtype=numpy.float64)
+        self._mean_: numpy.ndarray = numpy.zeros((num_envs, size), dtype=numpy.float64)
+        self._m2_: numpy.ndarray = numpy.zeros((num_envs, size), dtype=numpy.float64)
+        self._zscore_: numpy.ndarray = numpy.zeros((num_envs, size), dtype=numpy.float64)
+
+    def update(self, values: numpy.ndarray) -> numpy.ndarray:
+        _values_: numpy.ndarray = numpy.asarray(values, dtype=numpy.float64)
+        _values_ = _values_.reshape(self.num_envs, self.size)
+
+        self._count_ += 1
+        delta: numpy.ndarray = _values_ - self._mean_
+        self._mean_ += delta / self._count_
+        self._m2_ += delta * (_values_ - self._mean_)
+
+        std: numpy.ndarray = numpy.sqrt(self._m2_ / self._count_)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            numpy.divide(_values_ - self._mean_, std, out=self._zscore_)
+
+        # Constant column
+        self._zscore_[self._m2_ == 0] = 0
+        numpy.nan_to_num(self._zscore_, copy=False)
+
+        return self._zscore_
+
+    @property
+    def zscore(self) -> numpy.ndarray:
+        return self._zscore_
+
+    def reset(self, index=None):
+        if index is None:
+            index = slice(None)
+
+        self._count_[index] = 0
+        self._mean_[index] = 0
+        self._m2_[index] = 0
+        self._zscore_[index] = 0
@@ -0,0 +1,122 @@
+import cython
+import numpy
+import pandas
+
+from typing import Dict, List
+from market_simulator.common.history_buffer import HistoryBuffer
+from market_simulator.constant import ACTION_ALLOCATION, ACTION_TYPES
+
+
+class StepRecorder:
+    """
+        Columnar ledger of Simulator steps, one preallocated HistoryBuffer
+    per field. Actions are stored as indices into `ACTION`, action types as
+    `ACTION_TYPES` codes, dates as epoch milliseconds and per-asset fields
+    as (rows, n_assets) arrays.
+    """
+
+    # Field name, per asset or one value, dtype
+    FIELDS = [
+        ("Date", 0, numpy.int64),
+        ("Action", 0, numpy.int8),
+        ("ActionsType", 1, numpy.int8),
+        ("Reward", 0, numpy.float64),
+        ("PredictedReward", 0, numpy.float64),
+        ("TargetPrices", 1, numpy.float64),
+        ("AvgPrices", 1, numpy.float64),
+        ("Sizes", 1, numpy.float64),
+        ("TradesReturn", 1, numpy.float64),
+        ("PortfolioValue", 0, numpy.float64),
+        ("AssetsPnL", 1, numpy.float64),
+        ("Change", 0, numpy.float64),
+    ]
+
+    def __init__(self, symbols: List[str], capacity: cython.int):
+        self.symbols: List[str] = symbols
+        self._columns_: Dict[str, HistoryBuffer] = {
+            name: HistoryBuffer(width=len(symbols) if per_asset else 1,
+                                capacity=capacity,
+                                dtype=dtype)
+            for name, per_asset, dtype in self.FIELDS
+        }
+
+    def record(self,
+               trading_time: cython.longlong,
+               action: cython.int,
+               actions_type: List[int],
+               reward: cython.float,
+               predicted_reward: cython.float,
+               target_prices: List[float],
+               avg_prices: List[float],
+               sizes: List[float],
+               trades_return: List[float],
+               portfolio_value: cython.float,
+               assets_pnl: List[float],
+               change: cython.float):
+        self._columns_["Date"].append(trading_time)
+        self._columns_["Action"].append(action)
+        self._columns_["ActionsType"].append(actions_type)
+        self._columns_["Reward"].append(reward)
+        self._columns_["PredictedReward"].append(predicted_reward)
+        self._columns_["TargetPrices"].append(target_prices)
+        self._columns_["AvgPrices"].append(avg_prices)
+        self._columns_["Sizes"].append(sizes)
+        self._columns_["TradesReturn"].append(trades_return)
+        self._columns_["PortfolioValue"].append(portfolio_value)
+        self._columns_["AssetsPnL"].append(assets_pnl)
+        self._columns_["Change"].append(change)
+
+    def clear(self):
+        for column in self._columns_.values():
+            column.clear()
+
+    def rewind(self, length: cython.int):
+        """Drop the steps after `length`, earlier rows are kept as recorded"""
+        for column in self._columns_.values():
+            column.rewind(length)
+
+    def __len__(self) -> cython.int:
+        return len(self._columns_["Date"])
+
+    def to_dataframe(self, copy: bool = True) -> pandas.DataFrame:
+        """
+            Per-asset fields become one column per symbol, e.g. Sizes_BTCUSDT,
+        and ActionsType a categorical of the `ACTION_TYPES` names. The action
+        allocation is added as Allocation_<symbol>. Without `copy`, the columns
+        other than Date and Allocation are zero-copy views of the buffers, only
+        valid until the next step or `clear`, and writing to them changes the
+        recorder.
+        """
+        data = {}
+        for name, per_asset, _ in self.FIELDS:
+            values = self._columns_[name].values
+            if copy:
+                values = values.copy()
+
+            if name == "Date":
+                data[name] = pandas.to_datetime(values[:, 0], unit="ms")
+            elif name == "Action":
+                data[name] = values[:, 0]
+                allocation = ACTION_ALLOCATION[values[:, 0]]
+                for i, symbol in enumerate(self.symbols):
+                    data[f"Allocation_{symbol}"] = allocation[:, i]
+            elif name == "ActionsType":
+                for i, symbol in enumerate(self.symbols):
+                    data[f"{name}_{symbol}"] = \
+                        pandas.Categorical.from_codes(values[:, i], categories=ACTION_TYPES)
+            elif per_asset:
+                for i, symbol in enumerate(self.symbols):
+                    data[f"{name}_{symbol}"] = values[:, i]
+            else:
+                data[name] = values[:, 0]
+
+        return pandas.DataFrame(data, copy=False)
+
+    def write(self, file_path: str):
+        """Write the ledger as Parquet, or Arrow IPC for `.arrow`/`.feather`"""
+        ledger_df = self.to_dataframe(copy=False)
+
+        if file_path.endswith((".arrow", ".feather")):
+            ledger_df.to_feather(file_path)
+        else:
+            ledger_df.to_parquet(file_path, index=False)
@@ -1,4 +1,5 @@
 import cython
+import numpy
 
 from typing import Dict, List
 
@@ -65,4 +66,22 @@ ACTION: Dict[cython.int, List]  = {
     0: [0, 0]
 }
 
-NUM_ACTIONS: cython.int = len(ACTION)
\ No newline at end of file
+NUM_ACTIONS: cython.int = len(ACTION)
+
+# Allocation of each action indexed by action id, shape (NUM_ACTIONS, n_assets)
+ACTION_ALLOCATION: numpy.ndarray = numpy.array(
+    [ACTION[i] for i in range(NUM_ACTIONS)], dtype=numpy.float64
+)
+
+# Codes returned by vectorized order execution, see Asset.update
+ACTION_TYPES: List[str] = [
+    "HOLD",
+    "OPEN_NEW",
+    "INCREASE",
+    "DECREASE",
+    "CLOSE_OPEN_NEW",
+]
+ACTION_TYPE_CODES: Dict[str, cython.int] = {name: code for code, name in enumerate(ACTION_TYPES)}
+
+# Rows of episode history: one week of 4h candles plus the two-week lookback
+EPISODE_CAPACITY: cython.int = 6 * 7 * 3
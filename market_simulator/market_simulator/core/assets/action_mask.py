@@ -0,0 +1,60 @@
+import numpy
+
+from typing import List, Tuple
+from market_simulator.constant import ACTION_ALLOCATION
+from market_simulator.common import round_size
+
+
+class ActionMaskEngine:
+    """
+        Target sizes and can_rebalance test of PortfolioManager.avaiable_action
+    for every action at once. The (NUM_ACTIONS, n_assets) allocation matrix
+    and the rounding steps are prepared once per symbols list.
+    """
+
+    def __init__(self, symbols: List[str]):
+        self.symbols: List[str] = symbols
+        self.allocation: numpy.ndarray = ACTION_ALLOCATION
+
+        self._tick_size_, self._tick_min_order_size_ = \
+            round_size.step_sizes(symbols, 1)
+        self._step_size_, self._step_min_order_size_ = \
+            round_size.step_sizes(symbols, 0)
+
+    def orders(self,
+               allocation: numpy.ndarray,
+               portfolio_value: numpy.ndarray,
+               market_prices: numpy.ndarray,
+               sizes: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+            (can_rebalance, orders_size) for the given allocations, arguments
+        broadcast against each other and their last axis follows `symbols`.
+        """
+        order_value = round_size.round_to_step(
+            allocation * portfolio_value,
+            self._tick_size_,
+            self._tick_min_order_size_,
+        )
+        order_size = order_value / market_prices
+
+        size_change = round_size.round_to_step(
+            order_size - sizes,
+            self._step_size_,
+            self._step_min_order_size_,
+        )
+        can_rebalance = numpy.all(size_change != 0, axis=-1)
+
+        orders_size = round_size.round_to_step(
+            order_size,
+            self._step_size_,
+            self._step_min_order_size_,
+        )
+
+        return can_rebalance, orders_size
+
+    def all_orders(self,
+                   portfolio_value: float,
+                   market_prices: numpy.ndarray,
+                   sizes: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """(NUM_ACTIONS,) can_rebalance and (NUM_ACTIONS, n_assets) orders size"""
+        return self.orders(self.allocation, portfolio_value, market_prices, sizes)
@@ -102,6 +102,14 @@ class Asset:
 
         return trade_return, f"{action_type}_{round(size_change, 5)}"
 
+    def snapshot(self) -> tuple:
+        # Uncompiled, the fields can hold NumPy scalars that pickle ~10x larger
+        return (float(self._size_), float(self._avg_price_),
+                float(self._market_price_), float(self._realized_pnl_))
+
+    def restore(self, state: tuple):
+        self._size_, self._avg_price_, self._market_price_, self._realized_pnl_ = state
+
     def reset(self):
         self._realized_pnl_ = 0
         self._size_ = 0
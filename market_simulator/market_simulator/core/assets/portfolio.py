@@ -1,7 +1,9 @@
 import cython
+import numpy
 
 from typing import Dict, List
 from market_simulator.core.assets.asset import Asset
+from market_simulator.core.assets.action_mask import ActionMaskEngine
 from market_simulator.typing import (
     ActionType,
     AssetsAvgPrice,
@@ -12,7 +14,6 @@ from market_simulator.typing import (
     SizeOfAssets,
     ExecuteResult
 )
-from market_simulator.constant import ACTION
 from market_simulator.common import round_size
 
 @cython.dataclasses.dataclass
@@ -33,6 +34,10 @@ class PortfolioManager:
         self._market_price_: Dict[str, cython.float] = {s: 0 for s in self.symbols}
         self._previous_portfolio_value_ = self.initial_equity
 
+        # Orders of every action, valid until the portfolio or prices change
+        self._mask_engine_ = ActionMaskEngine(symbols=self.symbols)
+        self._orders_cache_ = None
+
     @property
     def avg_prices(self) -> AssetsAvgPrice:
         _avg_prices_ = {}
@@ -72,37 +77,39 @@ class PortfolioManager:
             changed_value=round_size.round_number(diff_portfolio_value),
         )
 
-    def avaiable_action(self, action_id: cython.int) -> AvaiableAction:
-        orders_size: Dict[str, cython.float] = {
-            self.symbols[0]: 0,
-            self.symbols[1]: 0,
-        }
-        can_rebalance: Dict[str, cython.int] = {
-            self.symbols[0]: 0,
-            self.symbols[1]: 0,
-        }
+    def _all_orders(self):
+        if self._orders_cache_ is None:
+            self._orders_cache_ = self._mask_engine_.all_orders(
+                portfolio_value=self.portfolio_info.portfolio_value,
+                market_prices=numpy.array(
+                    [self._market_price_[s] for s in self.symbols], dtype=numpy.float64
+                ),
+                sizes=numpy.array(
+                    [self._assets_[s].size for s in self.symbols], dtype=numpy.float64
+                ),
+            )
 
-        ratio = ACTION[action_id]
-        for idx, s in enumerate(self.symbols):
-            order_value: cython.float = ratio[idx] *\
-                                           self.portfolio_info.portfolio_value
-            order_value = round_size.size(s, order_value, 1)
-            order_size: cython.float = order_value / self.market_prices[s]
+        return self._orders_cache_
 
-            if action_id == 0:
-                order_size = 0
+    def avaiable_actions(self) -> numpy.ndarray:
+        """can_rebalance of every action, (NUM_ACTIONS,)"""
+        can_rebalance, _ = self._all_orders()
+        return can_rebalance
 
-            orders_size[s] = round_size.size(s, order_size, 0)
-            can_rebalance[s] = self._assets_[s].can_rebalance(order_size)
+    def avaiable_action(self, action_id: cython.int) -> AvaiableAction:
+        can_rebalance, orders_size = self._all_orders()
 
-        if sum(can_rebalance.values()) == 2:
-            return True, orders_size
-        else:
-            return False, orders_size
+        _orders_size_: Dict[str, cython.float] = {
+            s: float(orders_size[action_id, idx]) for idx, s in enumerate(self.symbols)
+        }
+
+        return bool(can_rebalance[action_id]), _orders_size_
 
     def update_market_price(self, market_price: AssetsMarketPrice):
         self._previous_portfolio_value_ = self.portfolio_info.portfolio_value
-        self._market_price_ = market_price
+        # Own copy, reset and restore write into it while callers may cache theirs
+        self._market_price_ = dict(market_price)
+        self._orders_cache_ = None
 
     def execute_order(self, action_id: cython.int) -> ExecuteResult:
         
@@ -125,12 +132,30 @@ class PortfolioManager:
                 order_size, self.market_prices[s]
             )
             trades_return[s] = round_size.round_number(trades_return[s])
-        
+
+        self._orders_cache_ = None
         execute_result = (trades_return, actions_type)
         return execute_result
 
+    def snapshot(self) -> tuple:
+        return (
+            tuple(self._assets_[s].snapshot() for s in self.symbols),
+            tuple(float(self._market_price_[s]) for s in self.symbols),
+            self._previous_portfolio_value_,
+        )
+
+    def restore(self, state: tuple):
+        assets_state, market_prices, self._previous_portfolio_value_ = state
+
+        for s, asset_state, market_price in zip(self.symbols, assets_state, market_prices):
+            self._assets_[s].restore(asset_state)
+            self._market_price_[s] = market_price
+
+        self._orders_cache_ = None
+
     def reset(self):
         self._previous_portfolio_value_ = self.initial_equity
+        self._orders_cache_ = None
 
         for s in self.symbols:
             self._assets_[s].reset()
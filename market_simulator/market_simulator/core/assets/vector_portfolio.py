@@ -0,0 +1,175 @@
+import cython
+import numpy
+
+from typing import List, Tuple
+from market_simulator.constant import ACTION_ALLOCATION, ACTION_TYPES
+from market_simulator.common import round_size
+from market_simulator.core.assets.action_mask import ActionMaskEngine
+
+HOLD: cython.int = ACTION_TYPES.index("HOLD")
+OPEN_NEW: cython.int = ACTION_TYPES.index("OPEN_NEW")
+INCREASE: cython.int = ACTION_TYPES.index("INCREASE")
+DECREASE: cython.int = ACTION_TYPES.index("DECREASE")
+CLOSE_OPEN_NEW: cython.int = ACTION_TYPES.index("CLOSE_OPEN_NEW")
+
+
+class VectorPortfolioManager:
+    """
+        PortfolioManager for N independent portfolios stored as (N, n_assets)
+    arrays. Every method follows the scalar PortfolioManager/Asset semantics,
+    `index` selects the portfolios to act on (all of them when None).
+    """
+
+    def __init__(self,
+                 symbols: List[str],
+                 initial_equity: cython.float,
+                 num_envs: cython.int):
+        self.symbols: List[str] = symbols
+        self.initial_equity: cython.float = initial_equity
+        self.num_envs: cython.int = num_envs
+
+        shape = (num_envs, len(symbols))
+
+        # Internal state: Must be reset after every episode
+        self._sizes_: numpy.ndarray = numpy.zeros(shape)
+        self._avg_prices_: numpy.ndarray = numpy.zeros(shape)
+        self._realized_pnl_: numpy.ndarray = numpy.zeros(shape)
+
+        # Price seen by the assets on their last update
+        self._asset_prices_: numpy.ndarray = numpy.zeros(shape)
+        self._market_prices_: numpy.ndarray = numpy.zeros(shape)
+        self._previous_portfolio_value_: numpy.ndarray = \
+            numpy.full(num_envs, initial_equity, dtype=numpy.float64)
+
+        self._mask_engine_ = ActionMaskEngine(symbols=self.symbols)
+
+    @property
+    def sizes(self) -> numpy.ndarray:
+        return self._sizes_
+
+    @property
+    def avg_prices(self) -> numpy.ndarray:
+        return self._avg_prices_
+
+    @property
+    def realized_pnl(self) -> numpy.ndarray:
+        return self._realized_pnl_
+
+    @property
+    def market_prices(self) -> numpy.ndarray:
+        return self._market_prices_
+
+    @property
+    def assets_pnl(self) -> numpy.ndarray:
+        unrealized_pnl = numpy.where(
+            self._asset_prices_ > 0,
+            (self._asset_prices_ - self._avg_prices_) * self._sizes_,
+            0,
+        )
+        return round_size.round_numbers(self._realized_pnl_ + unrealized_pnl)
+
+    @property
+    def portfolio_info(self) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """(portfolio_value, assets_pnl, changed_value) of every portfolio"""
+
+        assets_pnl = self.assets_pnl
+        portfolio_value = self.initial_equity + assets_pnl.sum(axis=1)
+        changed_value = round_size.round_numbers(
+            portfolio_value - self._previous_portfolio_value_
+        )
+
+        return portfolio_value, assets_pnl, changed_value
+
+    def avaiable_action(self, action_ids: numpy.ndarray):
+        """Vectorized PortfolioManager.avaiable_action, one action per portfolio"""
+
+        portfolio_value, _, _ = self.portfolio_info
+
+        return self._mask_engine_.orders(
+            ACTION_ALLOCATION[action_ids],
+            portfolio_value[:, None],
+            self._market_prices_,
+            self._sizes_,
+        )
+
+    def avaiable_actions(self) -> numpy.ndarray:
+        """can_rebalance of every action for every portfolio, (N, NUM_ACTIONS)"""
+
+        portfolio_value, _, _ = self.portfolio_info
+
+        can_rebalance, _ = self._mask_engine_.orders(
+            ACTION_ALLOCATION[None, :, :],
+            portfolio_value[:, None, None],
+            self._market_prices_[:, None, :],
+            self._sizes_[:, None, :],
+        )
+
+        return can_rebalance
+
+    def execute_order(self, action_ids: numpy.ndarray):
+        """
+            Vectorized PortfolioManager.execute_order, returns trades return
+        and `ACTION_TYPES` codes, both (N, n_assets).
+        """
+
+        can_rebalance, orders_size = self.avaiable_action(action_ids)
+        new_sizes = numpy.where(can_rebalance[:, None], orders_size, 0)
+        prices = self._market_prices_
+        self._asset_prices_[:] = prices
+
+        size_change = round_size.sizes(self.symbols, new_sizes - self._sizes_, 0)
+        size_change[new_sizes == 0] = 0
+        traded = size_change != 0
+
+        open_new = traded & (self._sizes_ == 0)
+        same_side = traded & ~open_new & (new_sizes * self._sizes_ > 0)
+        increase = same_side & (size_change * new_sizes > 0)
+        decrease = same_side & (size_change * new_sizes < 0)
+        close_open_new = traded & ~open_new & (new_sizes * self._sizes_ < 0)
+
+        trades_return = numpy.where(
+            traded, -numpy.abs(size_change) * prices * 0.0005, 0
+        )
+        trades_return += numpy.where(
+            decrease, (prices - self._avg_prices_) * new_sizes, 0
+        )
+        trades_return += numpy.where(
+            close_open_new, (prices - self._avg_prices_) * self._sizes_, 0
+        )
+        self._realized_pnl_ += numpy.where(decrease | close_open_new, trades_return, 0)
+
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            increased_avg_price = (
+                self._sizes_ * self._avg_prices_ + size_change * prices
+            ) / (self._sizes_ + size_change)
+
+        self._avg_prices_ = numpy.where(increase, increased_avg_price, self._avg_prices_)
+        self._avg_prices_ = numpy.where(open_new | close_open_new, prices, self._avg_prices_)
+        self._sizes_ = numpy.where(traded, new_sizes, self._sizes_)
+
+        actions_type = numpy.full(self._sizes_.shape, HOLD, dtype=numpy.int8)
+        actions_type[open_new] = OPEN_NEW
+        actions_type[increase] = INCREASE
+        actions_type[decrease] = DECREASE
+        actions_type[close_open_new] = CLOSE_OPEN_NEW
+
+        return round_size.round_numbers(trades_return), actions_type
+
+    def update_market_price(self, market_prices: numpy.ndarray, index=None):
+        if index is None:
+            index = slice(None)
+
+        portfolio_value, _, _ = self.portfolio_info
+        self._previous_portfolio_value_[index] = portfolio_value[index]
+        self._market_prices_[index] = market_prices
+
+    def reset(self, index=None):
+        if index is None:
+            index = slice(None)
+
+        self._previous_portfolio_value_[index] = self.initial_equity
+        self._sizes_[index] = 0
+        self._avg_prices_[index] = 0
+        self._realized_pnl_[index] = 0
+        self._asset_prices_[index] = 0
+        self._market_prices_[index] = 0
@@ -1,8 +1,15 @@
-from typing import List, Tuple
-from market_simulator.core.data_feed import fetch_data
+from glob import glob
+from typing import Dict, List, Tuple
+from market_simulator.core.data_feed import fetch_data, feature_cache
 from market_simulator.typing import AssetsMarketPrice
-from scipy.stats import zscore
+from market_simulator.common.running_stat import merge_moments
+from market_simulator.common.lru_cache import ByteLRUCache
 
+import os
+import json
+import time
+import shutil
+import warnings
 import cython
 import pandas
 import numpy
@@ -10,15 +17,30 @@ import numpy
 @cython.dataclasses.dataclass
 @cython.cclass
 class MarketState:
-        trading_time: cython.py_int
+        trading_time: cython.longlong
         obs: numpy.ndarray
         target_price: AssetsMarketPrice
         done: bool
 
 
+# Arrays needed to serve market states, see TrainData.materialize
+BUNDLE_ARRAYS: List[str] = [
+    "market_obs",
+    "obs_prefix_mean",
+    "obs_prefix_m2",
+    "week_bounds",
+    "target_prices",
+    "weekly_performance",
+    "trading_times",
+]
+BUNDLE_META = "meta.json"
+# TrainData is built from the klines of this interval
+BUNDLE_INTERVAL = "4h"
+
+
 class TrainData:
 
-    def _generate_market_obs(self) -> numpy.ndarray:
+    def _generate_market_obs(self, first_row: cython.int = 0) -> numpy.ndarray:
         market_data_continuous = []  # OHLC
 
         market_data_continuous += [
@@ -27,34 +49,150 @@ class TrainData:
             "delta",
             "vega",
         ]
-        return self._dataset_[market_data_continuous].to_numpy(copy=True)
-
-    def _generate_filter_index_with_weekly_perf(self):
-        week_ids = self._dataset_["week_id"].unique()
-        week_id_by_idx = []
-        weekly_performance: List[float] = []
-
-        for w_id in week_ids:
-            df = self._dataset_.query(f"week_id == {w_id}")
-            
-            def stat_perf():
-                perf_stat: List[float] = []
-                for symbol in self.symbols:
-                    a = df[f'close_{symbol}'].iloc[-1]
-                    b = df[f'open_{symbol}'].iloc[0]
-                    perf = (a - b)/b
-                    perf_stat.append(max(perf, 0.01))
-
-                return max(perf_stat)
-
-            w_id_idx = df["week_id"]
-            start_end = (w_id_idx.index[0], w_id_idx.index[-1])
-            week_perf = stat_perf()
-            weekly_performance.append(week_perf)
-            week_id_by_idx.append(start_end)
+        return self._dataset_.iloc[first_row:][market_data_continuous].to_numpy(copy=True)
+
+    def _generate_filter_index_with_weekly_perf(self, first_row: cython.int = 0):
+        """
+            (start, end) index of every week from `first_row` in order of
+        appearance and its performance: the best (close of last row - open of
+        first row) / open of the symbols, floored at 0.01. One pass over the
+        week_id column.
+        """
+        dataset = self._dataset_.iloc[first_row:]
+        week_id_values = dataset["week_id"].to_numpy()
+        num_rows = len(week_id_values)
+
+        _, first_rows = numpy.unique(week_id_values, return_index=True)
+        _, last_rows_reversed = numpy.unique(week_id_values[::-1], return_index=True)
+        last_rows = num_rows - 1 - last_rows_reversed
+
+        # numpy.unique sorts by week_id, keep the order of appearance
+        order = numpy.argsort(first_rows, kind="stable")
+        first_rows, last_rows = first_rows[order], last_rows[order]
+
+        index = dataset.index.to_numpy()
+        week_id_by_idx = list(zip(index[first_rows].tolist(), index[last_rows].tolist()))
+
+        opens = dataset[[f'open_{s}' for s in self.symbols]].to_numpy()
+        closes = dataset[[f'close_{s}' for s in self.symbols]].to_numpy()
+        perf = (closes[last_rows] - opens[first_rows]) / opens[first_rows]
+        weekly_performance: List[float] = \
+            numpy.maximum(perf, 0.01).max(axis=1).tolist()
 
         return week_id_by_idx, weekly_performance
 
+    def _generate_market_obs_stats(self, first_week: cython.int = 0):
+        """
+            Within-week expanding (mean, M2) of `_market_obs_` for every row
+        from `first_week`, centered on the first row of its week to keep the
+        sums small. The last row of a week holds that week's full statistics.
+        """
+        first_row: cython.int = self._week_id_by_idx_[first_week][0]
+        shape = (len(self._market_obs_) - first_row, self._market_obs_.shape[1])
+        prefix_mean = numpy.empty(shape, dtype=numpy.float64)
+        prefix_m2 = numpy.empty(shape, dtype=numpy.float64)
+
+        for start, end in self._week_id_by_idx_[first_week:]:
+            week_obs = self._market_obs_[start:end + 1].astype(numpy.float64)
+            centered = week_obs - week_obs[0]
+            count = numpy.arange(1, len(week_obs) + 1, dtype=numpy.float64)[:, None]
+
+            sum_1 = numpy.cumsum(centered, axis=0)
+            sum_2 = numpy.cumsum(centered * centered, axis=0)
+
+            rows = slice(start - first_row, end + 1 - first_row)
+            prefix_mean[rows] = week_obs[0] + sum_1 / count
+            prefix_m2[rows] = numpy.maximum(sum_2 - sum_1 * sum_1 / count, 0)
+
+        return prefix_mean, prefix_m2
+
+    def _market_obs_zscore(self,
+                           week_id: cython.int,
+                           cursor: cython.int) -> numpy.ndarray:
+        """
+            Same as `zscore(self._market_obs_[start_last_2:cursor])[-1]`,
+        merged from the precomputed weekly statistics in constant time.
+        """
+        start_last_2, end_last_2 = self._week_id_by_idx_[week_id - 2]
+        start_last_1, end_last_1 = self._week_id_by_idx_[week_id - 1]
+        start_curr, _ = self._week_id_by_idx_[week_id]
+
+        count, mean, m2 = merge_moments(
+            end_last_2 - start_last_2 + 1,
+            self._obs_prefix_mean_[end_last_2],
+            self._obs_prefix_m2_[end_last_2],
+            end_last_1 - start_last_1 + 1,
+            self._obs_prefix_mean_[end_last_1],
+            self._obs_prefix_m2_[end_last_1],
+        )
+
+        last_idx: cython.int = cursor - 1
+        if last_idx >= start_curr:
+            count, mean, m2 = merge_moments(
+                count, mean, m2,
+                last_idx - start_curr + 1,
+                self._obs_prefix_mean_[last_idx],
+                self._obs_prefix_m2_[last_idx],
+            )
+
+        std: numpy.ndarray = numpy.sqrt(m2 / count)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            obs: numpy.ndarray = (self._market_obs_[last_idx] - mean) / std
+
+        # Constant feature over the window
+        obs[m2 == 0] = numpy.nan
+
+        return obs
+
+    def _market_obs_zscores(self,
+                            week_ids: numpy.ndarray,
+                            cursors: numpy.ndarray) -> numpy.ndarray:
+        """Batched `_market_obs_zscore`, one row per (week_id, cursor)"""
+
+        start_last_2, end_last_2 = self._week_bounds_[week_ids - 2].T
+        start_last_1, end_last_1 = self._week_bounds_[week_ids - 1].T
+        start_curr = self._week_bounds_[week_ids, 0]
+
+        count, mean, m2 = merge_moments(
+            (end_last_2 - start_last_2 + 1)[:, None],
+            self._obs_prefix_mean_[end_last_2],
+            self._obs_prefix_m2_[end_last_2],
+            (end_last_1 - start_last_1 + 1)[:, None],
+            self._obs_prefix_mean_[end_last_1],
+            self._obs_prefix_m2_[end_last_1],
+        )
+
+        # Merge an empty sample when the window ends in the previous week
+        last_idx: numpy.ndarray = cursors - 1
+        has_curr: numpy.ndarray = last_idx >= start_curr
+        curr_idx: numpy.ndarray = numpy.where(has_curr, last_idx, end_last_1)
+        count, mean, m2 = merge_moments(
+            count, mean, m2,
+            numpy.where(has_curr, last_idx - start_curr + 1, 0)[:, None],
+            self._obs_prefix_mean_[curr_idx],
+            self._obs_prefix_m2_[curr_idx] * has_curr[:, None],
+        )
+
+        std: numpy.ndarray = numpy.sqrt(m2 / count)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            obs: numpy.ndarray = (self._market_obs_[last_idx] - mean) / std
+
+        # Constant feature over the window
+        obs[m2 == 0] = numpy.nan
+
+        return obs
+
+    def _generate_lookup_arrays(self):
+        week_bounds = numpy.array(self._week_id_by_idx_, dtype=numpy.int64)
+        target_prices = numpy.stack(
+            [s.to_numpy(dtype=numpy.float64) for s in self._target_price_series_],
+            axis=1
+        )
+        weekly_performance = numpy.array(self._weekly_performance_, dtype=numpy.float64)
+        trading_times = self._trading_time_.to_numpy(dtype=numpy.int64)
+
+        return week_bounds, target_prices, weekly_performance, trading_times
+
     def _target_price_series(self):
         return [
             self._dataset_[f"close_{self.symbols[0]}"].shift(-1).fillna(-99),
@@ -64,10 +202,20 @@ class TrainData:
     def _trading_time_series(self):
         return self._dataset_["open_time"]
 
-    def __init__(self, symbols: List[str]) -> None:
-        self.symbols = symbols
+    def _build(self,
+               dataset: pandas.DataFrame = None,
+               first_week: cython.int = 0,
+               last_week: int = None):
+        """
+            Arrays serving the weeks of `dataset`. With `first_week`, the
+        dataset starts at that week of the full dataset and the earlier weeks
+        are placeholders so week ids keep their meaning. Rows after
+        `last_week` only provide target prices.
+        """
+        if dataset is None:
+            dataset = fetch_data.generate_dataset(self.symbols)
 
-        self._dataset_: pandas.DataFrame = fetch_data.generate_dataset(self.symbols)
+        self._dataset_: pandas.DataFrame = dataset
         self._target_price_series_: List[pandas.Series] = self._target_price_series()
         self._trading_time_: pandas.Series = self._trading_time_series()
         
@@ -75,12 +223,235 @@ class TrainData:
         self._weekly_performance_: List[int] = []
         self._week_id_by_idx_, self._weekly_performance_ =\
             self._generate_filter_index_with_weekly_perf()
+        if last_week is not None:
+            del self._week_id_by_idx_[last_week - first_week + 1:]
+            del self._weekly_performance_[last_week - first_week + 1:]
+        self._week_id_by_idx_ = [(0, -1)] * first_week + self._week_id_by_idx_
+        self._weekly_performance_ = [numpy.nan] * first_week + self._weekly_performance_
         self._market_obs_: numpy.ndarray = self._generate_market_obs()
+        self._obs_prefix_mean_, self._obs_prefix_m2_ = \
+            self._generate_market_obs_stats(first_week)
+        self._week_bounds_, self._target_prices_, self._weekly_performance_arr_, \
+            self._trading_times_ = self._generate_lookup_arrays()
+
+    def _extend(self, dataset: pandas.DataFrame, first_changed_row: cython.int):
+        """
+            Switch to `dataset`, equal to the current one before
+        `first_changed_row`. The week index is rebuilt from the last week,
+        observations and their statistics from the week of the first changed
+        row, the other arrays are kept and appended to.
+        """
+        last_row: cython.int = min(first_changed_row, len(self._dataset_) - 1)
+        last_week: cython.int = len(self._week_id_by_idx_) - 1
+        first_week: cython.int = \
+            int(numpy.searchsorted(self._week_bounds_[:, 1], first_changed_row))
+
+        self._dataset_ = dataset
+        self._target_price_series_ = self._target_price_series()
+        self._trading_time_ = self._trading_time_series()
+
+        week_id_by_idx, weekly_performance = \
+            self._generate_filter_index_with_weekly_perf(
+                first_row=self._week_id_by_idx_[last_week][0]
+            )
+        self._week_id_by_idx_ = self._week_id_by_idx_[:last_week] + week_id_by_idx
+        self._weekly_performance_ = self._weekly_performance_[:last_week] + weekly_performance
+
+        first_row: cython.int = self._week_id_by_idx_[first_week][0]
+        self._market_obs_ = numpy.concatenate(
+            [self._market_obs_[:first_row], self._generate_market_obs(first_row)]
+        )
+        prefix_mean, prefix_m2 = self._generate_market_obs_stats(first_week)
+        self._obs_prefix_mean_ = numpy.concatenate(
+            [self._obs_prefix_mean_[:first_row], prefix_mean]
+        )
+        self._obs_prefix_m2_ = numpy.concatenate([self._obs_prefix_m2_[:first_row], prefix_m2])
+
+        # The target price of the previous last row was unknown
+        self._week_bounds_ = numpy.array(self._week_id_by_idx_, dtype=numpy.int64)
+        self._target_prices_ = numpy.concatenate([
+            self._target_prices_[:last_row],
+            numpy.stack([s.iloc[last_row:].to_numpy(dtype=numpy.float64)
+                         for s in self._target_price_series_], axis=1),
+        ])
+        self._weekly_performance_arr_ = \
+            numpy.array(self._weekly_performance_, dtype=numpy.float64)
+        self._trading_times_ = numpy.concatenate([
+            self._trading_times_[:last_row],
+            self._trading_time_.iloc[last_row:].to_numpy(dtype=numpy.int64),
+        ])
+
+    def _bundle_arrays(self) -> Dict[str, numpy.ndarray]:
+        return {
+            "market_obs": self._market_obs_,
+            "obs_prefix_mean": self._obs_prefix_mean_,
+            "obs_prefix_m2": self._obs_prefix_m2_,
+            "week_bounds": self._week_bounds_,
+            "target_prices": self._target_prices_,
+            "weekly_performance": self._weekly_performance_arr_,
+            "trading_times": self._trading_times_,
+        }
+
+    def _load_bundle(self, bundle_path: str):
+        """
+            Open a bundle written by `materialize`. Arrays are memory-mapped
+        read-only so every process using the same bundle shares its pages.
+        A bundle built from other klines than the stored ones is still
+        opened, with a warning.
+        """
+        # Every file from the same version, even if `materialize` swaps it meanwhile
+        bundle_path = os.path.realpath(bundle_path)
+        with open(os.path.join(bundle_path, BUNDLE_META)) as f:
+            meta = json.load(f)
+
+        assert meta["symbols"] == list(self.symbols), \
+            f"Bundle built for {meta['symbols']}, expected {self.symbols}"
+
+        try:
+            fingerprint = feature_cache.fingerprint(list(self.symbols), BUNDLE_INTERVAL)
+        except FileNotFoundError:
+            # No klines stored here to compare with
+            fingerprint = meta.get("fingerprint")
+        if meta.get("fingerprint") != fingerprint:
+            warnings.warn(f"Dataset bundle {bundle_path} is older than the stored klines, "
+                          f"materialize it again to train on the new candles")
+
+        arrays = {
+            name: numpy.load(os.path.join(bundle_path, f"{name}.npy"), mmap_mode="r")
+            for name in BUNDLE_ARRAYS
+        }
+
+        self._dataset_: pandas.DataFrame = None
+        self._target_price_series_: List[pandas.Series] = None
+        self._trading_time_: pandas.Series = None
+
+        self._market_obs_: numpy.ndarray = arrays["market_obs"]
+        self._obs_prefix_mean_: numpy.ndarray = arrays["obs_prefix_mean"]
+        self._obs_prefix_m2_: numpy.ndarray = arrays["obs_prefix_m2"]
+        self._week_bounds_: numpy.ndarray = arrays["week_bounds"]
+        self._target_prices_: numpy.ndarray = arrays["target_prices"]
+        self._weekly_performance_arr_: numpy.ndarray = arrays["weekly_performance"]
+        self._trading_times_: numpy.ndarray = arrays["trading_times"]
+
+        self._week_id_by_idx_: List[Tuple[int, int]] = \
+            [tuple(bounds) for bounds in self._week_bounds_.tolist()]
+        self._weekly_performance_: List[float] = self._weekly_performance_arr_.tolist()
+
+    def _build_weeks(self):
+        dataset, first_week, last_week = \
+            fetch_data.generate_weeks_dataset(self.symbols, *self.weeks)
+        self._build(dataset, first_week=first_week, last_week=last_week)
+
+    def __init__(self,
+                 symbols: List[str],
+                 bundle_path: str = None,
+                 obs_cache_bytes: int = 0,
+                 weeks: Tuple[int, int] = None) -> None:
+        """
+            `weeks` (first, last) loads only those weeks, negative ones counting
+        from the last week, see `fetch_data.generate_weeks_dataset`. Market
+        states of a week need the two weeks before it.
+        """
+        self.symbols = symbols
+        self.bundle_path: str = bundle_path
+        self.weeks: Tuple[int, int] = weeks
+
+        if bundle_path:
+            if not os.path.exists(os.path.join(bundle_path, BUNDLE_META)):
+                raise FileNotFoundError(
+                    f"No dataset bundle in {bundle_path}, write it with TrainData.materialize"
+                )
+            self._load_bundle(bundle_path)
+        elif weeks is not None:
+            self._build_weeks()
+        else:
+            self._build()
+
+        # Market states of recently sampled weeks, disabled with 0 bytes
+        self._obs_cache_: ByteLRUCache = \
+            ByteLRUCache(obs_cache_bytes) if obs_cache_bytes > 0 else None
+
+    def materialize(self, bundle_path: str):
+        """
+            Write the arrays serving market states as .npy files, so other
+        processes can open them with `TrainData(bundle_path=)` instead of
+        rebuilding the dataset. The files go to a new `<bundle_path>.v<n>`
+        directory and the `bundle_path` symlink is then swapped to it, so a
+        reader opens either the previous bundle or the complete new one.
+        The fingerprint of the stored klines is recorded to detect stale
+        bundles.
+        """
+        bundle_path = bundle_path.rstrip(os.sep)
+        version_path = f"{bundle_path}.v{time.time_ns()}"
+        os.makedirs(version_path)
+
+        for name, array in self._bundle_arrays().items():
+            numpy.save(os.path.join(version_path, f"{name}.npy"),
+                       numpy.ascontiguousarray(array))
+
+        with open(os.path.join(version_path, BUNDLE_META), "w") as f:
+            json.dump({
+                "symbols": list(self.symbols),
+                "fingerprint": feature_cache.fingerprint(list(self.symbols), BUNDLE_INTERVAL),
+            }, f)
+
+        previous_path = os.path.realpath(bundle_path) if os.path.islink(bundle_path) else None
+        if os.path.isdir(bundle_path) and not os.path.islink(bundle_path):
+            # A bundle written as a directory, moved aside as a link cannot replace it
+            previous_path = f"{bundle_path}.v0"
+            os.replace(bundle_path, previous_path)
+
+        link_path = f"{bundle_path}.link-{os.getpid()}"
+        os.symlink(os.path.basename(version_path), link_path)
+        os.replace(link_path, bundle_path)
+
+        # Readers may still be opening the previous version, the older ones
+        # are only mapped by processes that already opened them
+        for path in glob(f"{bundle_path}.v*"):
+            if path not in (version_path, previous_path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _week_market_states(self, week_id: cython.int):
+        """
+            Every `get_market_state` of the week at once, the observations
+        are rows of one (steps, n_features) matrix. Returns the states and
+        the bytes of their arrays.
+        """
+        start_curr, end_curr = self._week_id_by_idx_[week_id]
+        cursors = numpy.arange(start_curr, end_curr + 1)
+
+        obs: numpy.ndarray = self._market_obs_zscores(
+            numpy.full(len(cursors), week_id), cursors
+        )
+        target_prices: numpy.ndarray = numpy.array(self._target_prices_[start_curr:end_curr + 1])
+        trading_times: List[int] = self._trading_times_[start_curr:end_curr + 1].tolist()
+
+        states = tuple(
+            MarketState(
+                trading_time=trading_times[i],
+                obs=obs[i],
+                target_price={
+                    symbol: target_prices[i, j] for j, symbol in enumerate(self.symbols)
+                },
+                done=cursor == end_curr
+            )
+            for i, cursor in enumerate(range(start_curr, end_curr + 1))
+        )
+
+        return states, obs.nbytes + target_prices.nbytes + 8 * len(trading_times)
 
     def get_market_state(self,
                          week_id: cython.int,
                          trade_time_id: cython.int) -> MarketState:
-        start_last_2, _ = self._week_id_by_idx_[week_id - 2]
+        if self._obs_cache_ is not None:
+            states = self._obs_cache_.get(week_id)
+            if states is None:
+                states, nbytes = self._week_market_states(week_id)
+                self._obs_cache_.put(week_id, states, nbytes)
+
+            if trade_time_id < len(states):
+                return states[trade_time_id]
+
         start_curr, end_curr = self._week_id_by_idx_[week_id]
 
         # Index start from zero
@@ -89,14 +460,14 @@ class TrainData:
         if _cursor_ == end_curr:
             done = True
 
-        obs: numpy.ndarray = zscore(self._market_obs_[start_last_2:_cursor_])[-1]
+        obs: numpy.ndarray = self._market_obs_zscore(week_id, _cursor_)
 
         _targets_price_curr_: AssetsMarketPrice = {
-            self.symbols[0]: self._target_price_series_[0][_cursor_],
-            self.symbols[1]: self._target_price_series_[1][_cursor_],
+            self.symbols[0]: self._target_prices_[_cursor_, 0],
+            self.symbols[1]: self._target_prices_[_cursor_, 1],
         }
 
-        _trading_time_curr_: int = int(self._trading_time_[_cursor_])
+        _trading_time_curr_: int = int(self._trading_times_[_cursor_])
 
         return MarketState(
             trading_time=_trading_time_curr_,
@@ -105,6 +476,46 @@ class TrainData:
             done=done
         )
 
+    def get_market_states(self,
+                          week_ids: numpy.ndarray,
+                          trade_time_ids: numpy.ndarray):
+        """
+            Batched `get_market_state`, returns (trading_time, obs, target_price,
+        done) arrays with one row per (week_id, trade_time_id) pair.
+        """
+        start_curr, end_curr = self._week_bounds_[week_ids].T
+        cursors = start_curr + trade_time_ids
+
+        return (
+            self._trading_times_[cursors],
+            self._market_obs_zscores(week_ids, cursors),
+            self._target_prices_[cursors],
+            cursors == end_curr,
+        )
+
+    def get_week_prices(self, week_id: cython.int):
+        """(trading_time, target_price) of every trade time of the week"""
+        start_curr, end_curr = self._week_id_by_idx_[week_id]
+
+        return (
+            self._trading_times_[start_curr:end_curr + 1],
+            self._target_prices_[start_curr:end_curr + 1],
+        )
+
+    def obs_cache_stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters of the week cache, empty when disabled"""
+        if self._obs_cache_ is None:
+            return {}
+
+        return self._obs_cache_.stats()
+
+    def get_weeks_performance(self, week_ids: numpy.ndarray) -> numpy.ndarray:
+        return self._weekly_performance_arr_[week_ids]
+
+    @property
+    def num_market_features(self) -> cython.int:
+        return self._market_obs_.shape[1]
+
     @property
     def total_week_id(self):
         return len(self._week_id_by_idx_)
@@ -112,17 +523,43 @@ class TrainData:
     def get_week_performance(self, week_id: int):
         return self._weekly_performance_[week_id]
     
-    def refresh(self):
+    def refresh(self, incremental: bool = True):
+        """
+            Reload the dataset. With `incremental`, only the klines after the
+        last open_time are read and the arrays are extended, see
+        `fetch_data.extend_dataset`. A TrainData opened from a bundle has no
+        dataset in memory and is always rebuilt, one limited to `weeks`
+        reloads those weeks.
+        """
+        if incremental and self._dataset_ is not None and self.weeks is None:
+            dataset, first_changed_row = \
+                fetch_data.extend_dataset(self._dataset_, self.symbols)
+
+            if first_changed_row == 0:
+                self._build(dataset)
+            elif first_changed_row < len(dataset):
+                self._extend(dataset, first_changed_row)
+
+            if self._obs_cache_ is not None:
+                self._obs_cache_.clear()
+            return
+
         del self._dataset_
         del self._target_price_series_
         del self._trading_time_
         del self._week_id_by_idx_
         del self._weekly_performance_
         del self._market_obs_
+        del self._obs_prefix_mean_
+        del self._obs_prefix_m2_
+        del self._week_bounds_
+        del self._target_prices_
+        del self._weekly_performance_arr_
+        del self._trading_times_
 
-        self._dataset_: pandas.DataFrame = fetch_data.generate_dataset(self.symbols)
-        self._target_price_series_: List[pandas.Series] = self._target_price_series()
-        self._trading_time_: pandas.Series = self._trading_time_series()
-        self._week_id_by_idx_, self._weekly_performance_ =\
-            self._generate_filter_index_with_weekly_perf()
-        self._market_obs_: numpy.ndarray = self._generate_market_obs()
\ No newline at end of file
+        if self.weeks is not None:
+            self._build_weeks()
+        else:
+            self._build()
+        if self._obs_cache_ is not None:
+            self._obs_cache_.clear()
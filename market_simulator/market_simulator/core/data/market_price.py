@@ -6,8 +6,24 @@ import numpy
 from cython.cimports.libc import math
 
 
+def _pack_rng_state(rng: numpy.random.Generator) -> tuple:
+    """PCG64 state of `rng` as a tuple of ints, its state dict pickles to ~3x the size"""
+    state = rng.bit_generator.state
+    return (state["state"]["state"], state["state"]["inc"],
+            state["has_uint32"], state["uinteger"])
+
+
+def _unpack_rng_state(rng: numpy.random.Generator, state: tuple):
+    rng.bit_generator.state = {
+        "bit_generator": "PCG64",
+        "state": {"state": state[0], "inc": state[1]},
+        "has_uint32": state[2],
+        "uinteger": state[3],
+    }
+
+
 class HistoricalPriceManager:
-    def _initialize_indices(self) -> iter:
+    def _initialize_indices(self) -> numpy.ndarray:
         total_week_id = 0
         if self.evaluation:
             total_week_id = self.train_data.total_week_id
@@ -17,9 +33,12 @@ class HistoricalPriceManager:
         max_range: cython.int = \
             math.lround(self.curr_num_train_weeks_pct * total_week_id)
         arr = numpy.arange(2, max_range)
+        # The schedule is rebuilt from this state on restore, see `snapshot`
+        self._indices_rng_state_: tuple = _pack_rng_state(self.rng)
         self.rng.shuffle(arr)
+        self._train_week_id_pos_: cython.int = 0
 
-        return iter(arr)
+        return arr
 
     def _get_week_id_curr(self) -> cython.int:
 
@@ -27,30 +46,43 @@ class HistoricalPriceManager:
             return self.num_weeks_train
 
         else:
-            try:
-                return int(next(self._train_week_id_indices_))
-            except StopIteration:
+            if self._train_week_id_pos_ >= len(self._train_week_id_indices_):
                 # Update new indices list
                 del self._train_week_id_indices_
-                self._train_week_id_indices_: iter =\
+                self._train_week_id_indices_: numpy.ndarray =\
                     self._initialize_indices()
 
-            return int(next(self._train_week_id_indices_))
+            week_id: cython.int = \
+                int(self._train_week_id_indices_[self._train_week_id_pos_])
+            self._train_week_id_pos_ += 1
+
+            return week_id
 
 
     def __init__(self, symbols: List[str],
                         num_weeks_train: cython.int,
-                        evaluation: int) -> None:
+                        evaluation: int,
+                        bundle_path: str = None,
+                        obs_cache_bytes: int = 0,
+                        eval_weeks_only: int = 0) -> None:
 
         self.symbols: List[str] = symbols
         self.num_weeks_train: cython.int = num_weeks_train
         self.evaluation: int = evaluation
         self.start_time = datetime.now()
-        self.train_data: TrainData = TrainData(symbols=symbols)
+
+        # Evaluation replays week `num_weeks_train`, its observations need the
+        # two weeks before. A negative week is counted from the last one
+        weeks = (num_weeks_train - 2, max(num_weeks_train, -1)) \
+            if evaluation and eval_weeks_only else None
+        self.train_data: TrainData = TrainData(symbols=symbols,
+                                               bundle_path=bundle_path,
+                                               obs_cache_bytes=obs_cache_bytes,
+                                               weeks=weeks)
         self.curr_num_train_weeks_pct: float = 0.1
         self.rng: numpy.random.Generator = numpy.random.default_rng()
 
-        self._train_week_id_indices_: iter = \
+        self._train_week_id_indices_: numpy.ndarray = \
             self._initialize_indices()
 
         self._week_id_curr_: cython.int = self._get_week_id_curr()
@@ -68,14 +100,93 @@ class HistoricalPriceManager:
     def performance(self):
         return self.train_data.get_week_performance(self._week_id_curr_)
 
+    def snapshot(self) -> tuple:
+        """
+            Cursors and RNG states, fixed-size. The shuffled week schedule is
+        not stored but shuffled again from the RNG state it was drawn with.
+        """
+        return (
+            self._week_id_curr_,
+            self._trade_time_idx_curr_,
+            self.curr_num_train_weeks_pct,
+            self._train_week_id_pos_,
+            self._indices_rng_state_,
+            _pack_rng_state(self.rng),
+        )
+
+    def restore(self, state: tuple):
+        self._week_id_curr_, self._trade_time_idx_curr_, \
+            self.curr_num_train_weeks_pct, train_week_id_pos, \
+            indices_rng_state, rng_state = state
+
+        _unpack_rng_state(self.rng, indices_rng_state)
+        self._train_week_id_indices_ = self._initialize_indices()
+        self._train_week_id_pos_ = train_week_id_pos
+        _unpack_rng_state(self.rng, rng_state)
+
+    @property
+    def market_state(self):
+        """The state last returned by `market_obs`"""
+        return self.train_data.get_market_state(
+            self._week_id_curr_, self._trade_time_idx_curr_ - 1
+        )
+
     def reset(self, num_train_weeks_pct: float):
         if num_train_weeks_pct != self.curr_num_train_weeks_pct:
             del self._train_week_id_indices_
             self.curr_num_train_weeks_pct = num_train_weeks_pct
-            self._train_week_id_indices_: iter =\
+            self._train_week_id_indices_: numpy.ndarray =\
                 self._initialize_indices()
 
         self._week_id_curr_ = self._get_week_id_curr()
         self._trade_time_idx_curr_ = 0
 
         return self.market_obs()
+
+
+class VectorHistoricalPriceManager(HistoricalPriceManager):
+    """
+        HistoricalPriceManager for N episodes sharing one TrainData. Week ids
+    are drawn from the same shuffled schedule, cursors are (N,) arrays.
+    """
+
+    def __init__(self, symbols: List[str],
+                        num_weeks_train: cython.int,
+                        evaluation: int,
+                        num_envs: cython.int,
+                        bundle_path: str = None) -> None:
+        super().__init__(symbols=symbols,
+                         num_weeks_train=num_weeks_train,
+                         evaluation=evaluation,
+                         bundle_path=bundle_path)
+
+        self.num_envs: cython.int = num_envs
+        self._week_ids_curr_: numpy.ndarray = numpy.zeros(num_envs, dtype=numpy.int64)
+        self._trade_time_ids_curr_: numpy.ndarray = numpy.zeros(num_envs, dtype=numpy.int64)
+
+    def market_obs(self, index: numpy.ndarray):
+        market_states = self.train_data.get_market_states(
+            self._week_ids_curr_[index], self._trade_time_ids_curr_[index]
+        )
+        self._trade_time_ids_curr_[index] += 1
+
+        return market_states
+
+    @property
+    def performance(self) -> numpy.ndarray:
+        return self.train_data.get_weeks_performance(self._week_ids_curr_)
+
+    def reset(self, num_train_weeks_pct: float, index: numpy.ndarray):
+        if num_train_weeks_pct != self.curr_num_train_weeks_pct:
+            del self._train_week_id_indices_
+            self.curr_num_train_weeks_pct = num_train_weeks_pct
+            self._train_week_id_indices_: numpy.ndarray =\
+                self._initialize_indices()
+
+        num_reset: cython.int = self._week_ids_curr_[index].size
+        self._week_ids_curr_[index] = [
+            self._get_week_id_curr() for _ in range(num_reset)
+        ]
+        self._trade_time_ids_curr_[index] = 0
+
+        return self.market_obs(index)
@@ -2,11 +2,62 @@ import os
 from pathlib import Path
 
 PRICE_ZIP_URL = "https://data.binance.vision/data"
-CACHE_DATA = "/home/quoclht/Projects/SafeAlpha/cache_data/"
+
+# Columns of the archives and of the klines API, in order
+KLINE_COLUMNS = [
+    "open_time",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "close_time",
+    "quote_volume",
+    "count",
+    "taker_buy_volume",
+    "taker_buy_quote_volume",
+    "ignore",
+]
+KLINE_DTYPES = {
+    "open_time": "int64",
+    "open": "float64",
+    "high": "float64",
+    "low": "float64",
+    "close": "float64",
+    "volume": "float64",
+    "close_time": "int64",
+    "quote_volume": "float64",
+    "count": "int64",
+    "taker_buy_volume": "float64",
+    "taker_buy_quote_volume": "float64",
+    "ignore": "float64",
+}
+
+CACHE_DATA = os.path.join(
+    os.environ.get("MARKET_SIMULATOR_CACHE", "/home/quoclht/Projects/SafeAlpha/cache_data"), ""
+)
 
 
 def _get_klines_path():
-    base_path = CACHE_DATA + "klines/"
+    # Archives and the kline store can live apart from the rest of the cache
+    base_path = os.path.join(
+        os.environ.get("MARKET_SIMULATOR_KLINES", CACHE_DATA + "klines/"), ""
+    )
+
+    if not os.path.exists(base_path):
+        Path(base_path).mkdir(parents=True, exist_ok=True)
+
+    return base_path
+
+
+KLINES_PATH = _get_klines_path()
+
+# Downloaded archives with their size and SHA256, kept in KLINES_PATH
+ARCHIVE_MANIFEST = "manifest.json"
+
+
+def _get_features_path():
+    base_path = CACHE_DATA + "features/"
 
     if not os.path.exists(base_path):
         Path(base_path).mkdir(parents=True, exist_ok=True)
@@ -14,4 +65,4 @@ def _get_klines_path():
     return base_path
 
 
-KLINES_PATH = _get_klines_path()
\ No newline at end of file
+FEATURES_PATH = _get_features_path()
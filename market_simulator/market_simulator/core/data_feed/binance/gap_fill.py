@@ -0,0 +1,135 @@
+import time
+import random
+import threading
+
+import numpy
+import pandas
+from binance.spot import Spot
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from market_simulator.core.data_feed.common.downloader import TokenBucket
+from market_simulator.core.data_feed.binance.constants import KLINE_COLUMNS, KLINE_DTYPES
+from market_simulator.core.data_feed.kline_store import KlineStore
+
+# Most candles a klines request returns
+KLINES_LIMIT = 1000
+
+INTERVAL_UNITS_MS = {
+    "s": 1000,
+    "m": 60 * 1000,
+    "h": 3600 * 1000,
+    "d": 24 * 3600 * 1000,
+    "w": 7 * 24 * 3600 * 1000,
+}
+
+
+def interval_ms(interval: str) -> int:
+    """Length of a fixed interval such as `4h`, months have no fixed length"""
+    if interval[-1] not in INTERVAL_UNITS_MS:
+        raise ValueError(f"Unsupported interval {interval}")
+
+    return int(interval[:-1]) * INTERVAL_UNITS_MS[interval[-1]]
+
+
+def find_gaps(open_time: numpy.ndarray, step_ms: int, end_time: int = None) -> List[Tuple[int, int]]:
+    """
+        (first, last) open_time of every run of missing candles in the sorted
+    `open_time`, and after its last candle up to `end_time` when given.
+    """
+    if len(open_time) == 0:
+        return []
+
+    gaps_after = numpy.flatnonzero(numpy.diff(open_time) > step_ms)
+    gaps = [
+        (int(open_time[i]) + step_ms, int(open_time[i + 1]) - step_ms) for i in gaps_after
+    ]
+
+    if end_time is not None and int(open_time[-1]) + step_ms <= end_time:
+        gaps.append((int(open_time[-1]) + step_ms, end_time))
+
+    return gaps
+
+
+def pages(gaps: List[Tuple[int, int]], step_ms: int, limit: int = KLINES_LIMIT) -> List[Tuple[int, int]]:
+    """(startTime, endTime) requests of at most `limit` candles covering `gaps`"""
+    return [
+        (start, min(start + (limit - 1) * step_ms, last))
+        for first, last in gaps
+        for start in range(first, last + 1, limit * step_ms)
+    ]
+
+
+class KlineGapFiller:
+    """
+        Fill the missing candles of the store from the klines REST API. Each
+    gap is split into pages of KLINES_LIMIT candles requested on
+    `max_workers` threads sharing one TokenBucket, failed pages are retried
+    `max_retries` times with exponential backoff.
+    """
+
+    def __init__(self,
+                 base_url: str = None,
+                 max_workers: int = 4,
+                 rate: float = 5.0,
+                 burst: int = 5,
+                 max_retries: int = 3,
+                 backoff: float = 1.0):
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._bucket_ = TokenBucket(rate=rate, capacity=burst)
+        self._local_ = threading.local()
+
+    def _client(self) -> Spot:
+        # One client, and HTTP session, per worker thread
+        if not hasattr(self._local_, "client"):
+            self._local_.client = \
+                Spot(base_url=self.base_url) if self.base_url is not None else Spot()
+
+        return self._local_.client
+
+    def _fetch_page(self, symbol: str, interval: str, start_time: int, end_time: int) -> List[List]:
+        for attempt in range(self.max_retries + 1):
+            self._bucket_.acquire()
+            try:
+                return self._client().klines(symbol=symbol,
+                                             interval=interval,
+                                             startTime=start_time,
+                                             endTime=end_time,
+                                             limit=KLINES_LIMIT)
+
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"Failed {symbol} {interval} klines "
+                          f"[{start_time}, {end_time}] after {attempt + 1} attempts: {e}")
+                    return []
+
+                delay = self.backoff * 2 ** attempt + random.uniform(0, self.backoff)
+                print(f"Retrying {symbol} {interval} klines in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+    def fill(self, symbol: str, interval: str, store: KlineStore, end_time: int = None) -> int:
+        """
+            Request the gaps of `symbol` in `store`, up to `end_time` (ms, now
+        by default), and write the candles returned. Returns their count.
+        """
+        step_ms = interval_ms(interval)
+        end_time = end_time if end_time is not None else int(time.time() * 1000)
+        open_time = store.read(symbol, interval, columns=["open_time"])["open_time"].to_numpy()
+        requests = pages(find_gaps(open_time, step_ms, end_time), step_ms)
+        if not requests:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(lambda page: self._fetch_page(symbol, interval, *page), requests)
+            rows = [row for result in results for row in result]
+
+        if rows:
+            df = pandas.DataFrame(rows, columns=KLINE_COLUMNS).astype(KLINE_DTYPES)
+            store.write(symbol, interval, df)
+
+        print(f"Filled {len(rows)} {symbol} {interval} klines from {len(requests)} requests")
+        return len(rows)
@@ -1,4 +1,6 @@
 import time
+import zipfile
+import resource
 from datetime import datetime
 from glob import glob
 
@@ -6,12 +8,20 @@ from glob import glob
 import pandas
 from binance.spot import Spot
 
-from market_simulator.core.data_feed.common.request_data import download_file
-from market_simulator.core.data_feed.binance.constants import PRICE_ZIP_URL, KLINES_PATH
-from typing import Tuple
+from market_simulator.core.data_feed.common.downloader import ConcurrentDownloader
+from market_simulator.core.data_feed.common.archive_manifest import ArchiveManifest
+from market_simulator.core.data_feed.kline_store import KlineStore
+from market_simulator.core.data_feed.binance.gap_fill import KlineGapFiller
+from market_simulator.core.data_feed.binance.constants import (
+    PRICE_ZIP_URL,
+    KLINES_PATH,
+    ARCHIVE_MANIFEST,
+    KLINE_COLUMNS,
+    KLINE_DTYPES,
+)
+from typing import Dict, List, Tuple
 # from configs import data_source, path_file
 
-
 class KLineDataFeed:
 
     def _get_url(self, year: str, month: str, day: str = None) -> Tuple[str, str]:
@@ -26,31 +36,37 @@ class KLineDataFeed:
 
         return url, file_name
 
-    def _fetch_zip_file(self):
-
+    def zip_jobs(self) -> List[Tuple[str, str]]:
+        """(file_url, file_path) of every monthly archive before the current month"""
         current_year = datetime.now().year
         current_month = datetime.now().month
 
         year_iter = range(2021, current_year + 1)
         month_iter = range(1, 12 + 1)
 
+        jobs = []
         for yi in year_iter:
             for mi in month_iter:
                 if yi == current_year and mi == current_month:
-                    return 0
-                else:
-                    file_url, file_name = self._get_url(
-                        year=str(yi).zfill(2),
-                        month=str(mi).zfill(2)
-                    )
-
-                    file_path = f"{KLINES_PATH}/{file_name}"
-                    download_file(
-                        file_url=file_url,
-                        file_path=file_path
-                    )
-                    print(f"Downloaded {file_name}")
-                    time.sleep(2)
+                    return jobs
+
+                file_url, file_name = self._get_url(
+                    year=str(yi).zfill(2),
+                    month=str(mi).zfill(2)
+                )
+                jobs.append((file_url, f"{KLINES_PATH}/{file_name}"))
+
+        return jobs
+
+    def _fetch_zip_file(self, downloader: ConcurrentDownloader = None):
+        if downloader is None:
+            downloader = ConcurrentDownloader(
+                manifest=ArchiveManifest(f"{KLINES_PATH}/{ARCHIVE_MANIFEST}")
+            )
+
+        downloaded = downloader.download(self.zip_jobs())
+        print(f"Downloaded {sum(downloaded.values())}/{len(downloaded)} "
+              f"{self.symbol} {self.interval} archives")
 
     def _fetch_api(self):
         client = Spot()
@@ -62,71 +78,87 @@ class KLineDataFeed:
         mk_data.to_csv(full_path)
         time.sleep(2)
 
-    def __init__(self, symbol: str, interval: str, market: str = "spot") -> None:
+    def __init__(self,
+                 symbol: str,
+                 interval: str,
+                 market: str = "spot",
+                 store: KlineStore = None) -> None:
 
         self.symbol = symbol
         self.interval = interval
         self.market = market
+        self.store = store if store is not None else KlineStore()
         self.candle_type = "klines"
         self.period = "monthly"
 
 
-    def _merge_data(self):
-        file_name = f"{self.symbol}{self.interval}-api.csv"
-        COLUMNS = [
-            "open_time",
-            "open",
-            "high",
-            "low",
-            "close",
-            "volume",
-            "close_time",
-            "quote_volume",
-            "count",
-            "taker_buy_volume",
-            "taker_buy_quote_volume",
-            "ignore",
+    def _read_zip(self, file_path: str) -> pandas.DataFrame:
+        with zipfile.ZipFile(file_path) as zf, zf.open(zf.namelist()[0]) as f:
+            # Some archives start with a header line, sniff it without parsing twice
+            first_line = f.readline()
+            header = None if first_line[:1].isdigit() else 0
+            f.seek(0)
+
+            return pandas.read_csv(
+                f, header=header, names=KLINE_COLUMNS, dtype=KLINE_DTYPES, engine="c"
+            )
+
+    def _merge_data(self) -> Dict[str, float]:
+        """
+            Merge the monthly archives not stored yet and the API klines into
+        the store. On a duplicated open_time the API row wins, only the
+        months that change are written.
+        """
+        start = time.perf_counter()
+
+        # `<symbol>-<interval>-YYYY-MM.zip`
+        archived = set(self.store.archived_months(self.symbol, self.interval))
+        zip_files = [
+            f for f in sorted(glob(f"{KLINES_PATH}/{self.symbol}-{self.interval}-*.zip"))
+            if f[-11:-4] not in archived
         ]
 
-        # Read ZIP files
-        df = pandas.DataFrame(columns=COLUMNS)
-        for f in glob(f"{KLINES_PATH}/{self.symbol}-*.zip"):
-            _df_ = pandas.read_csv(f, compression="zip")
+        written = set()
+        if zip_files:
+            df = pandas.concat([self._read_zip(f) for f in zip_files], ignore_index=True, copy=False)
+            written.update(self.store.write(self.symbol, self.interval, df, archived=True))
+            del df
 
-            try:
-                float(_df_.columns[0])
-                _df_f_ = pandas.read_csv(f, compression="zip", header=None, names=COLUMNS)
-                df = pandas.concat([df, _df_f_])
-
-            except Exception:
-                _df = pandas.read_csv(
-                    f,
-                    compression="zip",
-                )
-                assert len(df.columns) == len(
-                    _df.columns
-                ), "Expect columns have same length!"
-                df = pandas.concat([df, _df])
-        
-        # Read API file
-        _df_api = pandas.read_csv(
-            f"{KLINES_PATH}/{file_name}",
+        # Written after the archives so its rows replace theirs
+        df_api = pandas.read_csv(
+            f"{KLINES_PATH}/{self.symbol}{self.interval}-api.csv",
             header=None,
-            names=COLUMNS,
-            skiprows=1
+            names=KLINE_COLUMNS,
+            dtype=KLINE_DTYPES,
+            skiprows=1,
+            index_col=0,
         )
-
-        df = pandas.concat([df, _df_api])
-
-        df.drop_duplicates(ignore_index=True, inplace=True)
-
-        # Save merged data
-        merged_file_full_path = f"{KLINES_PATH}/{self.symbol}.pq"
-        df.to_parquet(merged_file_full_path, index=False)
-
-    def update(self, with_zip: bool):
+        written.update(self.store.write(self.symbol, self.interval, df_api))
+
+        # Peak RSS of the process, ru_maxrss is in KB on Linux
+        stats = {
+            "archives": len(zip_files),
+            "partitions": len(written),
+            "seconds": time.perf_counter() - start,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+        print(f"Merged {stats['archives']} archives of {self.symbol} {self.interval} "
+              f"into {stats['partitions']} partitions in {stats['seconds']:.2f}s, "
+              f"peak RSS {stats['peak_rss_mb']:.0f} MB")
+
+        return stats
+
+    def update(self,
+               with_zip: bool,
+               downloader: ConcurrentDownloader = None,
+               gap_filler: KlineGapFiller = None):
         if with_zip:
-            self._fetch_zip_file()
+            self._fetch_zip_file(downloader)
         
         self._fetch_api()
-        self._merge_data()
\ No newline at end of file
+        self._merge_data()
+
+        # The latest API klines may not reach back to the last archive
+        if gap_filler is None:
+            gap_filler = KlineGapFiller()
+        gap_filler.fill(self.symbol, self.interval, self.store)
\ No newline at end of file
@@ -0,0 +1,48 @@
+import os
+import json
+import threading
+
+from datetime import datetime
+from typing import Dict
+
+
+class ArchiveManifest:
+    """
+        Size and SHA256 of every downloaded archive, stored as JSON next to
+    them. Archives of past months never change, so an archive still on disk
+    with its recorded size is not downloaded again.
+    """
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = manifest_path
+        self._lock_ = threading.Lock()
+        self._entries_: Dict[str, Dict] = {}
+
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self._entries_ = json.load(f)
+
+    def is_complete(self, file_path: str) -> bool:
+        entry = self._entries_.get(os.path.basename(file_path))
+
+        return entry is not None \
+            and os.path.exists(file_path) \
+            and os.path.getsize(file_path) == entry["size"]
+
+    def record(self, file_path: str, sha256: str, verified: bool):
+        """`verified` when `sha256` matched the published checksum"""
+        with self._lock_:
+            self._entries_[os.path.basename(file_path)] = {
+                "size": os.path.getsize(file_path),
+                "sha256": sha256,
+                "verified": verified,
+                "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            self._save()
+
+    def _save(self):
+        tmp_path = f"{self.manifest_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries_, f, indent=1, sort_keys=True)
+
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,115 @@
+import os
+import time
+import random
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from market_simulator.core.data_feed.common.archive_manifest import ArchiveManifest
+from market_simulator.core.data_feed.common.request_data import (
+    download_file,
+    fetch_checksum,
+    file_sha256,
+)
+
+
+class TokenBucket:
+    """
+        Thread-safe rate limiter: `rate` requests per second on average,
+    bursts of up to `capacity` requests.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens_ = float(capacity)
+        self._last_refill_ = time.monotonic()
+        self._lock_ = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock_:
+                now = time.monotonic()
+                self._tokens_ = min(
+                    self.capacity, self._tokens_ + (now - self._last_refill_) * self.rate
+                )
+                self._last_refill_ = now
+
+                if self._tokens_ >= 1:
+                    self._tokens_ -= 1
+                    return
+
+                wait = (1 - self._tokens_) / self.rate
+
+            time.sleep(wait)
+
+
+class ConcurrentDownloader:
+    """
+        Download files on `max_workers` threads sharing one TokenBucket, so
+    every symbol and interval synced together respects the same request
+    rate. Failed downloads are retried `max_retries` times with exponential
+    backoff, a missing file (HTTP 404) is not retried.
+
+    Each file is checked against the `<file_url>.CHECKSUM` published next to
+    it, a mismatch deletes the file and counts as a failed attempt. With a
+    `manifest`, files recorded there are skipped and checked files are added.
+    """
+
+    def __init__(self,
+                 max_workers: int = 4,
+                 rate: float = 2.0,
+                 burst: int = 4,
+                 max_retries: int = 3,
+                 backoff: float = 1.0,
+                 manifest: ArchiveManifest = None):
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.manifest = manifest
+        self._bucket_ = TokenBucket(rate=rate, capacity=burst)
+
+    def _fetch(self, file_url: str, file_path: str) -> bool:
+        # Files already on disk from before the manifest are only checked
+        if not os.path.exists(file_path):
+            self._bucket_.acquire()
+            if not download_file(file_url=file_url, file_path=file_path):
+                return False
+
+        self._bucket_.acquire()
+        checksum = fetch_checksum(f"{file_url}.CHECKSUM")
+        sha256 = file_sha256(file_path)
+
+        if checksum is not None and checksum != sha256:
+            os.remove(file_path)
+            raise ValueError(f"Checksum mismatch {sha256} != {checksum}")
+
+        if self.manifest is not None:
+            self.manifest.record(file_path, sha256=sha256, verified=checksum is not None)
+
+        return True
+
+    def _download(self, file_url: str, file_path: str) -> bool:
+        if self.manifest is not None and self.manifest.is_complete(file_path):
+            return True
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._fetch(file_url=file_url, file_path=file_path)
+
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"Failed {file_url} after {attempt + 1} attempts: {e}")
+                    return False
+
+                delay = self.backoff * 2 ** attempt + random.uniform(0, self.backoff)
+                print(f"Retrying {file_url} in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+    def download(self, jobs: List[Tuple[str, str]]) -> Dict[str, bool]:
+        """(file_url, file_path) jobs, returns whether each file_path is available"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(lambda job: self._download(*job), jobs)
+
+            return {file_path: ok for (_, file_path), ok in zip(jobs, results)}
@@ -1,24 +1,79 @@
+import os
+import hashlib
+
 from urllib import request
 from urllib.error import HTTPError
 
-def download_file(file_url: str, file_path: str):
+
+def file_sha256(file_path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(block)
+
+    return sha256.hexdigest()
+
+
+def download_file(file_url: str, file_path: str, timeout: float = 60) -> bool:
+    """
+        Download through `<file_path>.part`, renamed to `file_path` once
+    complete. A `.part` left by an interrupted download is resumed with an
+    HTTP Range request.
+
+    Returns False when the file does not exist (HTTP 404), other
+    HTTP and network errors are raised for the caller to retry.
+    """
     print(f"Downloading {file_url}")
+    part_path = f"{file_path}.part"
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+    req = request.Request(file_url)
+    if offset:
+        req.add_header("Range", f"bytes={offset}-")
+
     try:
-        dl_file = request.urlopen(file_url)
-        length = dl_file.getheader("content-length")
-        if length:
-            length = int(length)
-            blocksize = max(4096, length // 100)
-
-        with open(file_path, "wb") as out_file:
-            dl_progress = 0
-            while True:
-                buf = dl_file.read(blocksize)
-                if not buf:
-                    break
-                dl_progress += len(buf)
-                out_file.write(buf)
-
-    except HTTPError:
+        dl_file = request.urlopen(req, timeout=timeout)
+
+    except HTTPError as e:
+        if e.code == 416:
+            # The .part already holds the whole file
+            os.replace(part_path, file_path)
+            return True
+
+        if e.code != 404:
+            raise
+
         print("\nFile not found: {}".format(file_url))
-        pass
\ No newline at end of file
+        return False
+
+    # Servers ignoring Range answer 200 with the whole file
+    mode = "ab" if offset and dl_file.status == 206 else "wb"
+
+    length = dl_file.getheader("content-length")
+    blocksize = 1 << 16
+    if length:
+        length = int(length)
+        blocksize = max(4096, length // 100)
+
+    with open(part_path, mode) as out_file:
+        while True:
+            buf = dl_file.read(blocksize)
+            if not buf:
+                break
+            out_file.write(buf)
+
+    os.replace(part_path, file_path)
+    return True
+
+
+def fetch_checksum(checksum_url: str, timeout: float = 60) -> str:
+    """SHA256 from a `<sha256>  <file name>` checksum file, None when missing"""
+    try:
+        with request.urlopen(checksum_url, timeout=timeout) as response:
+            return response.read().decode().split()[0].lower()
+
+    except HTTPError as e:
+        if e.code != 404:
+            raise
+
+        return None
@@ -0,0 +1,71 @@
+import os
+import json
+import hashlib
+import pandas
+
+from glob import glob
+from datetime import datetime
+from typing import Dict, List
+
+from market_simulator.core.data_feed.binance.constants import FEATURES_PATH
+from market_simulator.core.data_feed.kline_store import KlineStore
+
+# Bump whenever generate_dataset changes the features it produces
+FEATURE_VERSION = "1"
+
+
+def fingerprint(symbols: List[str], interval: str, store: KlineStore = None) -> str:
+    """Cache key from the stored klines, symbols, interval and FEATURE_VERSION"""
+    store = store if store is not None else KlineStore()
+    sha256 = hashlib.sha256()
+    sha256.update(f"{FEATURE_VERSION}|{interval}|{','.join(symbols)}".encode())
+
+    for symbol in symbols:
+        sha256.update(store.fingerprint(symbol, interval).encode())
+
+    return sha256.hexdigest()[:32]
+
+
+def _data_path(key: str) -> str:
+    return f"{FEATURES_PATH}/{key}.pq"
+
+
+def _stats_path(key: str) -> str:
+    return f"{FEATURES_PATH}/{key}.json"
+
+
+def load(key: str) -> pandas.DataFrame:
+    """Cached dataset of `key`, None on a miss"""
+    if not os.path.exists(_data_path(key)):
+        return None
+
+    print(f"Loaded features from cache {key}")
+    return pandas.read_parquet(_data_path(key))
+
+
+def save(key: str, df: pandas.DataFrame, stats: Dict):
+    tmp_path = f"{_data_path(key)}.tmp-{os.getpid()}"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, _data_path(key))
+
+    stats = dict(stats, key=key, rows=len(df), created_at=datetime.utcnow().isoformat())
+    with open(_stats_path(key), "w") as f:
+        json.dump(stats, f, indent=2)
+
+
+def build_stats() -> List[Dict]:
+    """Build stats of every cached dataset"""
+    cache_stats = []
+    for stats_file in sorted(glob(f"{FEATURES_PATH}/*.json")):
+        with open(stats_file) as f:
+            cache_stats.append(json.load(f))
+
+    return cache_stats
+
+
+def invalidate(key: str = None):
+    """Remove the cached dataset of `key`, every cached dataset when None"""
+    pattern = key if key is not None else "*"
+    for f in glob(f"{FEATURES_PATH}/{pattern}.pq") + glob(f"{FEATURES_PATH}/{pattern}.json"):
+        os.remove(f)
+        print(f"Removed {f}")
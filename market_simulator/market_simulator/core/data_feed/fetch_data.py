@@ -1,24 +1,191 @@
+import time
 import numpy
+import pandas
 
-from typing import List
+from typing import List, Tuple
 
+from market_simulator.core.data_feed import feature_cache
 from market_simulator.core.data_feed.binance import kline
+from market_simulator.core.data_feed.binance.gap_fill import KlineGapFiller
+from market_simulator.core.data_feed.common.downloader import ConcurrentDownloader
+from market_simulator.core.data_feed.common.archive_manifest import ArchiveManifest
+from market_simulator.core.data_feed.binance.constants import KLINES_PATH, ARCHIVE_MANIFEST
+from market_simulator.core.data_feed.kline_store import KlineStore
 from market_simulator.core.data_feed.load import unify_symbols
 from market_simulator.core.data_feed.transform import hedge, trading_period
 
+# Rolling windows of hedge: 42 bars, hampel over 2 * 84 bars centered
+ROLLING_WINDOW = 42
+HAMPEL_WINDOW = 42 * 2
 
-def update(symbols: List[str], with_zip: bool, interval: str = "4h"):
-    for symbol in symbols:
-        kline_fetch = kline.KLineDataFeed(symbol=symbol, interval=interval)
-        kline_fetch.update(with_zip=with_zip)
+# Rows before and after a row that its features depend on
+WARMUP_ROWS = HAMPEL_WINDOW + ROLLING_WINDOW + 1
+LOOKAHEAD_ROWS = HAMPEL_WINDOW
 
+# Rows whose features change when candles are appended, and the rows of
+# history needed to recompute them exactly
+RECOMPUTE_ROWS = LOOKAHEAD_ROWS
+EXTEND_TAIL_ROWS = RECOMPUTE_ROWS + WARMUP_ROWS
 
-def generate_dataset(symbols: List[str]):
-    df = unify_symbols.unify(symbols=symbols)
-    df["week_id"] = numpy.copy(
-        trading_period.extract_week_id(open_time=df["open_time"])
+# Kline columns the features and TrainData use
+DATASET_COLUMNS = ["open_time", "open", "close"]
+
+
+def update(symbols: List[str],
+           with_zip: bool,
+           interval: str = "4h",
+           max_workers: int = 4,
+           rate: float = 2.0,
+           store: KlineStore = None):
+    """
+        Archives of every symbol are downloaded together on `max_workers`
+    threads limited to `rate` requests per second, then each symbol is
+    completed from the API and merged into `store`. The gaps left are filled
+    from paginated API requests on the same number of threads.
+    """
+    kline_fetches = [
+        kline.KLineDataFeed(symbol=symbol, interval=interval, store=store) for symbol in symbols
+    ]
+
+    if with_zip:
+        downloader = ConcurrentDownloader(
+            max_workers=max_workers,
+            rate=rate,
+            manifest=ArchiveManifest(f"{KLINES_PATH}/{ARCHIVE_MANIFEST}"),
+        )
+        jobs = [job for kline_fetch in kline_fetches for job in kline_fetch.zip_jobs()]
+        downloaded = downloader.download(jobs)
+        print(f"Downloaded {sum(downloaded.values())}/{len(jobs)} archives")
+
+    gap_filler = KlineGapFiller(max_workers=max_workers)
+    for kline_fetch in kline_fetches:
+        kline_fetch.update(with_zip=False, gap_filler=gap_filler)
+
+
+def generate_dataset(symbols: List[str],
+                     interval: str = "4h",
+                     use_cache: bool = True,
+                     store: KlineStore = None) -> pandas.DataFrame:
+    """
+        Merged klines with derived features. With `use_cache` the result is
+    stored under a fingerprint of the stored klines and reused until they change.
+    """
+    if not use_cache:
+        return _build_dataset(symbols, interval, store=store)
+
+    key = feature_cache.fingerprint(symbols=symbols, interval=interval, store=store)
+    df = feature_cache.load(key)
+
+    if df is None:
+        build_start = time.perf_counter()
+        df = _build_dataset(symbols, interval, store=store)
+        feature_cache.save(key, df, stats={
+            "symbols": symbols,
+            "interval": interval,
+            "feature_version": feature_cache.FEATURE_VERSION,
+            "build_seconds": time.perf_counter() - build_start,
+        })
+
+    return df
+
+
+def generate_weeks_dataset(symbols: List[str],
+                           first_week: int,
+                           last_week: int,
+                           interval: str = "4h",
+                           store: KlineStore = None) -> Tuple[pandas.DataFrame, int, int]:
+    """
+        Rows of weeks [first_week, last_week] of the `generate_dataset`
+    dataset, negative weeks counting from the last one, and the first row
+    after them for its target price. Only open_time of the whole history is
+    read to number the weeks, the timestamps every symbol has like
+    `generate_dataset`, then DATASET_COLUMNS of the weeks with WARMUP_ROWS
+    before and LOOKAHEAD_ROWS after them. Returns the dataset and the indices
+    of its first and last week in the full dataset.
+    """
+    open_time = unify_symbols.shared_open_time(symbols=symbols, interval=interval, store=store)
+
+    # The first ROLLING_WINDOW rows have no features, the full dataset starts after them
+    week_id = trading_period.extract_week_id(open_time=open_time).to_numpy()
+    week_index = week_id - week_id[ROLLING_WINDOW]
+    num_weeks = int(week_index[-1]) + 1
+
+    first_week = first_week + num_weeks if first_week < 0 else first_week
+    last_week = last_week + num_weeks if last_week < 0 else last_week
+    rows = numpy.flatnonzero((week_index >= first_week) & (week_index <= last_week))
+    first_row = max(int(rows[0]), ROLLING_WINDOW)
+    last_row = min(int(rows[-1]) + 1, len(open_time) - 1)
+
+    start_row = max(first_row - WARMUP_ROWS, 0)
+    end_row = min(last_row + LOOKAHEAD_ROWS, len(open_time) - 1)
+    df = unify_symbols.unify(symbols=symbols,
+                             interval=interval,
+                             start_time=int(open_time.iloc[start_row]),
+                             end_time=int(open_time.iloc[end_row]),
+                             columns=DATASET_COLUMNS,
+                             store=store)
+    df["week_id"] = week_id[start_row:end_row + 1]
+    df = _add_features(df, symbols)
+
+    df = df.iloc[first_row - start_row:last_row - start_row + 1]
+    return df.dropna().reset_index(drop=True), first_week, last_week
+
+
+def extend_dataset(df: pandas.DataFrame,
+                   symbols: List[str],
+                   interval: str = "4h",
+                   use_cache: bool = True,
+                   store: KlineStore = None) -> Tuple[pandas.DataFrame, int]:
+    """
+        `df` from `generate_dataset` extended with the klines stored after
+    its last open_time, equal to a full rebuild. Only the last
+    EXTEND_TAIL_ROWS rows are used as warm state for the rolling features.
+    Returns the dataset and its first row that differs from `df`.
+    """
+    new_df = unify_symbols.unify(symbols=symbols,
+                                 interval=interval,
+                                 start_time=int(df["open_time"].iloc[-1]) + 1,
+                                 store=store)
+    if len(new_df) == 0:
+        return df, len(df)
+
+    if len(df) < EXTEND_TAIL_ROWS:
+        return generate_dataset(symbols, interval=interval, use_cache=use_cache, store=store), 0
+
+    # Continue the week numbering from the last row
+    week_id = trading_period.extract_week_id(
+        open_time=pandas.concat([df["open_time"].iloc[-1:], new_df["open_time"]],
+                                ignore_index=True)
+    ).to_numpy()
+    new_df["week_id"] = week_id[1:] - week_id[0] + df["week_id"].iloc[-1]
+
+    tail = pandas.concat([df[new_df.columns].iloc[-EXTEND_TAIL_ROWS:], new_df],
+                         ignore_index=True)
+    tail = _add_features(tail, symbols)
+
+    first_changed_row = len(df) - RECOMPUTE_ROWS
+    extended = pandas.concat(
+        [df.iloc[:first_changed_row],
+         tail.iloc[EXTEND_TAIL_ROWS - RECOMPUTE_ROWS:].dropna()],
+        ignore_index=True,
     )
 
+    if use_cache:
+        feature_cache.save(
+            feature_cache.fingerprint(symbols=symbols, interval=interval, store=store),
+            extended,
+            stats={
+                "symbols": symbols,
+                "interval": interval,
+                "feature_version": feature_cache.FEATURE_VERSION,
+                "extended_rows": len(new_df),
+            },
+        )
+
+    return extended, first_changed_row
+
+
+def _add_features(df: pandas.DataFrame, symbols: List[str]) -> pandas.DataFrame:
     df['basis'] = numpy.copy(df[f"close_{symbols[0]}"] - df[f"close_{symbols[1]}"])
 
     df['mvhr'] = numpy.copy(
@@ -38,4 +205,14 @@ def generate_dataset(symbols: List[str]):
     df['delta'] = numpy.copy(delta)
     df['vega'] = numpy.copy(vega)
 
+    return df
+
+
+def _build_dataset(symbols: List[str], interval: str, store: KlineStore = None) -> pandas.DataFrame:
+    df = unify_symbols.unify(symbols=symbols, interval=interval, store=store)
+    df["week_id"] = numpy.copy(
+        trading_period.extract_week_id(open_time=df["open_time"])
+    )
+    df = _add_features(df, symbols)
+
     return df.dropna().reset_index(drop=True)
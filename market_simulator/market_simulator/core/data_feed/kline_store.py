@@ -0,0 +1,180 @@
+import os
+import json
+import hashlib
+import threading
+
+import numpy
+import pandas
+import pyarrow
+import pyarrow.parquet as pq
+
+from typing import Dict, List
+
+from market_simulator.core.data_feed.binance.constants import KLINES_PATH
+from market_simulator.core.data_feed.common.request_data import file_sha256
+
+INDEX_FILE = "_index.json"
+
+# Row groups with min/max statistics let readers skip the rows outside a time range
+ROW_GROUP_SIZE = 4096
+
+
+def partition_keys(open_time: pandas.Series) -> numpy.ndarray:
+    """`YYYY-MM` partition of every open_time (ms)"""
+    return numpy.datetime_as_string(
+        open_time.to_numpy(dtype="int64").astype("datetime64[ms]").astype("datetime64[M]")
+    )
+
+
+class KlineStore:
+    """
+        Klines kept as one parquet file per month under
+    `<root>/<symbol>/<interval>/<YYYY-MM>.pq`. An index next to the
+    partitions records min/max open_time, rows and SHA256 of each of them, so
+    readers open only the partitions overlapping a time range and writers
+    rewrite only the months they change.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root if root is not None else KLINES_PATH
+        self._lock_ = threading.Lock()
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol, interval)
+
+    def _partition_path(self, symbol: str, interval: str, key: str) -> str:
+        return os.path.join(self._dir(symbol, interval), f"{key}.pq")
+
+    def index(self, symbol: str, interval: str) -> Dict[str, Dict]:
+        """Entries of every partition by `YYYY-MM`, empty when nothing is stored"""
+        index_path = os.path.join(self._dir(symbol, interval), INDEX_FILE)
+        if not os.path.exists(index_path):
+            return {}
+
+        with open(index_path) as f:
+            return json.load(f)
+
+    def _save_index(self, symbol: str, interval: str, index: Dict[str, Dict]):
+        index_path = os.path.join(self._dir(symbol, interval), INDEX_FILE)
+        tmp_path = f"{index_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+
+        os.replace(tmp_path, index_path)
+
+    def archived_months(self, symbol: str, interval: str) -> List[str]:
+        """Partitions already holding their monthly archive"""
+        return [key for key, entry in self.index(symbol, interval).items() if entry["archived"]]
+
+    def fingerprint(self, symbol: str, interval: str) -> str:
+        """Changes whenever a partition of `symbol` is rewritten"""
+        index = self.index(symbol, interval)
+        if not index:
+            raise FileNotFoundError(f"No klines stored for {symbol} {interval} in {self.root}")
+
+        entries = [(key, index[key]["sha256"]) for key in sorted(index)]
+        return hashlib.sha256(json.dumps(entries).encode()).hexdigest()
+
+    def write(self, symbol: str, interval: str, df: pandas.DataFrame, archived: bool = False) -> List[str]:
+        """
+            Upsert the klines of `df`, a row of `df` replaces a stored row with
+        the same open_time. Only the months whose content changes are written.
+        `archived` marks the months of `df` as holding their monthly archive.
+
+        Returns the keys of the written partitions.
+        """
+        if len(df) == 0:
+            return []
+
+        os.makedirs(self._dir(symbol, interval), exist_ok=True)
+
+        with self._lock_:
+            index = self.index(symbol, interval)
+            written = []
+            index_changed = False
+
+            for key, month_df in df.groupby(partition_keys(df["open_time"]), sort=True):
+                path = self._partition_path(symbol, interval, key)
+                entry = index.get(key)
+
+                stored = pandas.read_parquet(path) if entry is not None else None
+                merged = month_df if stored is None else pandas.concat(
+                    [stored, month_df], ignore_index=True
+                )
+                merged = merged.sort_values("open_time", kind="stable") \
+                    .drop_duplicates(subset="open_time", keep="last", ignore_index=True)
+
+                if stored is not None and merged.equals(stored):
+                    if archived and not entry["archived"]:
+                        entry["archived"] = index_changed = True
+                    continue
+
+                tmp_path = f"{path}.tmp-{os.getpid()}"
+                pq.write_table(
+                    pyarrow.Table.from_pandas(merged, preserve_index=False),
+                    tmp_path,
+                    row_group_size=ROW_GROUP_SIZE,
+                    write_statistics=True,
+                )
+                os.replace(tmp_path, path)
+
+                index[key] = {
+                    "min_open_time": int(merged["open_time"].iloc[0]),
+                    "max_open_time": int(merged["open_time"].iloc[-1]),
+                    "rows": len(merged),
+                    "sha256": file_sha256(path),
+                    "archived": archived or (entry is not None and entry["archived"]),
+                }
+                written.append(key)
+                index_changed = True
+
+            if index_changed:
+                self._save_index(symbol, interval, index)
+
+        return written
+
+    def partitions(self,
+                   symbol: str,
+                   interval: str,
+                   start_time: int = None,
+                   end_time: int = None) -> List[str]:
+        """Paths of the partitions overlapping [start_time, end_time] (ms), in time order"""
+        index = self.index(symbol, interval)
+
+        return [
+            self._partition_path(symbol, interval, key)
+            for key in sorted(index)
+            if (start_time is None or index[key]["max_open_time"] >= start_time)
+            and (end_time is None or index[key]["min_open_time"] <= end_time)
+        ]
+
+    def read(self,
+             symbol: str,
+             interval: str,
+             start_time: int = None,
+             end_time: int = None,
+             columns: List[str] = None) -> pandas.DataFrame:
+        """
+            Klines of [start_time, end_time] (ms) sorted by open_time, all of
+        them when None. Only `columns` are read when given. Partitions are
+        memory-mapped and row groups outside the range are skipped from their
+        statistics.
+        """
+        if not self.index(symbol, interval):
+            raise FileNotFoundError(f"No klines stored for {symbol} {interval} in {self.root}")
+
+        filters = []
+        if start_time is not None:
+            filters.append(("open_time", ">=", start_time))
+        if end_time is not None:
+            filters.append(("open_time", "<=", end_time))
+
+        # Outside the stored range, the filters empty the last partition but keep its schema
+        paths = self.partitions(symbol, interval, start_time=start_time, end_time=end_time) \
+            or self.partitions(symbol, interval)[-1:]
+        tables = [
+            pq.read_table(path, columns=columns, filters=filters or None, memory_map=True)
+            for path in paths
+        ]
+
+        return pyarrow.concat_tables(tables).to_pandas()
@@ -1,20 +1,44 @@
+import numpy
 import pandas
+
+from functools import reduce
 from typing import Dict, List
 
-from market_simulator.core.data_feed.binance.constants import KLINES_PATH
+from market_simulator.core.data_feed.kline_store import KlineStore
+
 
+def _load_data(symbols: List[str],
+               interval: str,
+               start_time: int = None,
+               end_time: int = None,
+               columns: List[str] = None,
+               store: KlineStore = None) -> Dict[str, pandas.DataFrame]:
+    store = store if store is not None else KlineStore()
 
-def _load_data(symbols: List[str]) -> Dict[str, pandas.DataFrame]:
-    dfs_dict = {}
-    for symbol in symbols:
-        _df = pandas.read_parquet(f"{KLINES_PATH}/{symbol}.pq")
-        dfs_dict[symbol] = _df.sort_values("open_time")
+    # The store returns the klines sorted by open_time
+    return {
+        symbol: store.read(symbol, interval, start_time=start_time, end_time=end_time,
+                           columns=columns)
+        for symbol in symbols
+    }
 
-    return dfs_dict
 
+def unify(symbols: List[str],
+          interval: str = "4h",
+          start_time: int = None,
+          end_time: int = None,
+          columns: List[str] = None,
+          store: KlineStore = None) -> pandas.DataFrame:
+    """
+        Klines of `symbols` merged on open_time, within [start_time, end_time]
+    (ms) when given. `columns` restricts the kline columns read, open_time is
+    always included.
+    """
+    if columns is not None and "open_time" not in columns:
+        columns = ["open_time"] + list(columns)
 
-def unify(symbols: List[str]) -> pandas.DataFrame:
-    dfs_dict = _load_data(symbols)
+    dfs_dict = _load_data(symbols, interval, start_time=start_time, end_time=end_time,
+                          columns=columns, store=store)
     shared_df = pandas.merge(
         dfs_dict[symbols[0]],
         dfs_dict[symbols[1]],
@@ -24,4 +48,18 @@ def unify(symbols: List[str]) -> pandas.DataFrame:
     )
     shared_df.dropna(inplace=True)
     shared_df.sort_values(by='open_time', ignore_index=True, inplace=True)
-    return shared_df.reset_index(drop=True)
\ No newline at end of file
+    return shared_df.reset_index(drop=True)
+
+
+def shared_open_time(symbols: List[str],
+                     interval: str = "4h",
+                     store: KlineStore = None) -> pandas.Series:
+    """
+        Sorted open_time of the klines stored for every symbol, the rows
+    `unify` keeps. `unify` with only open_time keeps the timestamps of any
+    symbol instead, as its outer merge has no missing values to drop.
+    """
+    dfs_dict = _load_data(symbols, interval, columns=["open_time"], store=store)
+    open_time = reduce(numpy.intersect1d, (df["open_time"].to_numpy() for df in dfs_dict.values()))
+
+    return pandas.Series(open_time, name="open_time")
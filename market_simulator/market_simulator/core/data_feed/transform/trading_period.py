@@ -1,29 +1,39 @@
+import numpy
 import pandas
 
-from datetime import datetime
-from typing import List
+# 1970-01-01, day 0, was a Thursday
+EPOCH_WEEKDAY = 3
+HOUR_MS = 3600 * 1000
+
+
+def _utc_days(open_time: pandas.Series) -> numpy.ndarray:
+    """Days since 1970-01-01 (UTC) of every open_time (ms)"""
+    return open_time.to_numpy(dtype="int64") \
+        .astype("datetime64[ms]").astype("datetime64[D]").astype("int64")
+
 
 def extract_period(open_time: pandas.Series):
-    open_time_dt = open_time.apply(
-        lambda x: datetime.utcfromtimestamp(float(x) / 1000))
-    
-    period = (open_time_dt.dt.hour % 24 + 4) // 4 # 4h candle
+    hour = open_time.to_numpy(dtype="int64") // HOUR_MS % 24
+
+    period = pandas.Series((hour + 4) // 4, index=open_time.index)  # 4h candle
     dummy_period_df = pandas.get_dummies(period, prefix="period")
 
     return dummy_period_df
 
+
 def extract_week_id(open_time: pandas.Series):
-    open_time_dt = open_time.apply(
-        lambda x: datetime.utcfromtimestamp(float(x) / 1000))
-    
-    week_id: int = 0
-    week_id_col: List[int] = []
-    last_update_date: datetime.date = None
-    for ot in open_time_dt:
-        if ot.day_name() == 'Monday' and ot.date() != last_update_date:
-            week_id += 1
-            last_update_date = ot.date()
-
-        week_id_col.append(week_id)
-    
-    return pandas.Series(week_id_col)
\ No newline at end of file
+    """
+        Week number of every row, starting at 0 and incremented on the first
+    row of each Monday. A Monday only counts when it differs from the
+    previous Monday row, so a week without any Monday row continues the
+    previous week.
+    """
+    days = _utc_days(open_time)
+    monday_rows = numpy.flatnonzero((days + EPOCH_WEEKDAY) % 7 == 0)
+    monday_days = days[monday_rows]
+
+    new_week = numpy.zeros(len(days), dtype=bool)
+    new_week[monday_rows[:1]] = True
+    new_week[monday_rows[1:]] = monday_days[1:] != monday_days[:-1]
+
+    return pandas.Series(numpy.cumsum(new_week, dtype=numpy.int64))
@@ -1,5 +1,5 @@
+import os
 import numpy
-import pandas
 import gym
 import gc
 import cython
@@ -7,14 +7,16 @@ import cython
 from market_simulator.core.data.dataset import MarketState
 from market_simulator.core.assets.portfolio import PortfolioManager
 from market_simulator.core.data.market_price import HistoricalPriceManager
-from market_simulator.constant import ACTION, NUM_ACTIONS
+from market_simulator.constant import NUM_ACTIONS, EPISODE_CAPACITY, ACTION_TYPE_CODES
 from market_simulator.typing import ExecuteResult
 from market_simulator.common import round_size
+from market_simulator.common.running_stat import RunningZScore
+from market_simulator.common.step_recorder import StepRecorder
+from market_simulator.common.profiler import PhaseProfiler
 
-from datetime import datetime
+from pathlib import Path
 from gym import spaces
 from typing import Dict, List
-from scipy.stats import zscore
 
 @cython.dataclasses.dataclass
 @cython.cclass
@@ -24,6 +26,42 @@ class SimulatorConfigurations:
         num_weeks_train: cython.int
         evaluation: cython.int
         collect_step_detail: cython.int
+        ledger_dir: str
+        reuse_obs_buffer: cython.int
+        dataset_bundle: str
+        profile: cython.int
+        obs_cache_mb: cython.int
+        eval_weeks_only: cython.int
+
+@cython.dataclasses.dataclass
+@cython.cclass
+class SimulatorSnapshot:
+        """Mutable episode state of a Simulator, see `Simulator.snapshot`"""
+        portfolio: tuple
+        price: tuple
+        returns_zscore: tuple
+        reward_zscore: tuple
+        num_step_details: cython.int
+        action: cython.int
+        compelete: cython.int
+
+def observation_layout(num_assets: cython.int,
+                       num_market_features: cython.int) -> Dict[str, slice]:
+    """Slices of the observation vector: Portfolio, Reward, PrevAction, MarketObs"""
+    sizes = [
+        ("portfolio", 2 * num_assets + 2),  # TradesReturn, PortfolioValue, AssetsPnL, Change
+        ("reward", 1),
+        ("action", NUM_ACTIONS),
+        ("market", num_market_features),
+    ]
+
+    layout: Dict[str, slice] = {}
+    start: cython.int = 0
+    for name, size in sizes:
+        layout[name] = slice(start, start + size)
+        start += size
+
+    return layout
 
 class Simulator(gym.Env):
 
@@ -36,7 +74,6 @@ class Simulator(gym.Env):
         predicted_reward: cython.float,
     ):
         trades_return = list(execute_result[0].values())
-        actions_type = list(execute_result[1].values())
 
         portfolio_info = self._portfolio_manager_.portfolio_info
         portfolio_value = portfolio_info.portfolio_value
@@ -44,25 +81,29 @@ class Simulator(gym.Env):
         change_value = portfolio_info.changed_value
 
         _returns_ = trades_return + [portfolio_value] + assets_pnl + [change_value]
-        self._returns_collection_.append(_returns_)
-        self._reward_collection_.append(reward)
+        self._returns_zscore_.update(_returns_)
+        self._reward_zscore_.update(reward)
 
         if self.configs.collect_step_detail:
-            step_info = {
-                "Date": str(self._market_state_.trading_time),
-                "Action": ACTION[action],
-                "ActionsType": actions_type,
-                "Reward": round_size.round_number(reward),
-                "PredictedReward": round_size.round_number(float(predicted_reward)),
-                "TargetPrices": list(self._market_state_.target_price.values()),
-                "AvgPrices": list(self._portfolio_manager_.avg_prices.values()),
-                "Sizes": list(self._portfolio_manager_.sizes.values()),
-                "TradesReturn": trades_return,
-                "PortfolioValue": portfolio_value,
-                "AssetsPnL": assets_pnl,
-                "Change": change_value,
-            }
-            self._step_info_collection_.append(step_info)
+            # Asset.update returns `<ACTION_TYPE>_<size change>`
+            actions_type = [
+                ACTION_TYPE_CODES.get(action_type.rsplit("_", 1)[0], 0)
+                for action_type in execute_result[1].values()
+            ]
+            self._step_recorder_.record(
+                trading_time=self._market_state_.trading_time,
+                action=action,
+                actions_type=actions_type,
+                reward=round_size.round_number(reward),
+                predicted_reward=round_size.round_number(float(predicted_reward)),
+                target_prices=list(self._market_state_.target_price.values()),
+                avg_prices=list(self._portfolio_manager_.avg_prices.values()),
+                sizes=list(self._portfolio_manager_.sizes.values()),
+                trades_return=trades_return,
+                portfolio_value=portfolio_value,
+                assets_pnl=assets_pnl,
+                change=change_value,
+            )
 
     def __init__(self, configs: Dict) -> None:
         if cython.compiled:
@@ -75,18 +116,33 @@ class Simulator(gym.Env):
             initial_equity=1500,
             num_weeks_train=configs['num_weeks_train'],
             evaluation=configs['evaluation'],
-            collect_step_detail=configs['show_trade_result']
+            collect_step_detail=configs['show_trade_result'],
+            ledger_dir=configs.get('ledger_dir'),
+            reuse_obs_buffer=configs.get('reuse_obs_buffer', False),
+            dataset_bundle=configs.get('dataset_bundle'),
+            profile=configs.get('profile', False),
+            obs_cache_mb=configs.get('obs_cache_mb', 0),
+            eval_weeks_only=configs.get('eval_weeks_only', True)
         )
 
-        self._returns_collection_: List[List[float]] = []
-        self._reward_collection_: List[float] = []
-        self._step_info_collection_: List[Dict] = []
+        # TradesReturn, PortfolioValue, AssetsPnL, Change
+        num_returns: cython.int = 2 * len(self.configs.symbols) + 2
+
+        self._step_recorder_ = StepRecorder(symbols=self.configs.symbols,
+                                            capacity=EPISODE_CAPACITY)
+        self._num_episodes_: cython.int = 0
         self._action_: cython.int = 0
 
+        self._returns_zscore_ = RunningZScore(size=num_returns)
+        self._reward_zscore_ = RunningZScore(size=1)
+
         self._price_manager_ = HistoricalPriceManager(
                                     symbols=self.configs.symbols,
                                     num_weeks_train=self.configs.num_weeks_train,
-                                    evaluation=self.configs.evaluation
+                                    evaluation=self.configs.evaluation,
+                                    bundle_path=self.configs.dataset_bundle,
+                                    obs_cache_bytes=self.configs.obs_cache_mb * 1024 * 1024,
+                                    eval_weeks_only=self.configs.eval_weeks_only
         )
 
         self._portfolio_manager_ = PortfolioManager(
@@ -95,40 +151,91 @@ class Simulator(gym.Env):
         )
         self._market_state_: MarketState = None
         self._compelete_ = False
-    
+
+        # Observation buffers, returned as is with `reuse_obs_buffer`
+        self._obs_layout_: Dict[str, slice] = observation_layout(
+            num_assets=len(self.configs.symbols),
+            num_market_features=self._price_manager_.train_data.num_market_features
+        )
+        self._obs_size_: cython.int = self._obs_layout_["market"].stop
+        self._observations_: numpy.ndarray = \
+            numpy.zeros(self._obs_size_, dtype=numpy.float32)
+        self._action_mask_: numpy.ndarray = \
+            numpy.ones(NUM_ACTIONS, dtype=numpy.int8)
+
+        self._profiler_: PhaseProfiler = None
+        if self.configs.profile:
+            self._enable_profiler()
+
+    def _enable_profiler(self):
+        """
+            Shadow the hot-path methods with timed versions on this instance
+        only, a Simulator without profiling runs the plain methods.
+        observation_state includes the action_mask time.
+        """
+        self._profiler_ = PhaseProfiler()
+        wrap = self._profiler_.wrap
+
+        self._portfolio_manager_.execute_order = \
+            wrap("execute_order", self._portfolio_manager_.execute_order)
+        self._portfolio_manager_.update_market_price = \
+            wrap("update_market_price", self._portfolio_manager_.update_market_price)
+        self._portfolio_manager_.avaiable_actions = \
+            wrap("action_mask", self._portfolio_manager_.avaiable_actions)
+        self._price_manager_.market_obs = \
+            wrap("market_obs", self._price_manager_.market_obs)
+        self._reward_scheme = wrap("_reward_scheme", self._reward_scheme)
+        self._update_state = wrap("_update_state", self._update_state)
+        self.observation_state = wrap("observation_state", self.observation_state)
+        self.reset = wrap("reset", self.reset)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+            Per-phase timings when the 'profile' config is set, and the
+        market state cache counters under "obs_cache" when 'obs_cache_mb' is.
+        """
+        stats = {}
+        if self._profiler_ is not None:
+            stats.update(self._profiler_.stats())
+
+        obs_cache_stats = self._price_manager_.train_data.obs_cache_stats()
+        if obs_cache_stats:
+            stats["obs_cache"] = obs_cache_stats
+
+        return stats
+
+    def _obs_dict(self):
+        if self.configs.reuse_obs_buffer:
+            return {
+                "action_mask": self._action_mask_,
+                "observations": self._observations_,
+            }
+
+        return {
+            "action_mask": self._action_mask_.copy(),
+            "observations": self._observations_.copy(),
+        }
+
     def observation_state(self):
 
         # Generate user stat
-        portfolio_obs: numpy.ndarray = \
-            zscore(numpy.array(self._returns_collection_))[-1:]
-        numpy.nan_to_num(portfolio_obs, copy=False)
-        reward_obs: numpy.ndarray = zscore(numpy.array(self._reward_collection_))[-1:]
-        numpy.nan_to_num(reward_obs, copy=False)
-        action_obs: numpy.ndarray = numpy.array([0 for _ in range(NUM_ACTIONS)])
+        self._observations_[self._obs_layout_["portfolio"]] = self._returns_zscore_.zscore
+        self._observations_[self._obs_layout_["reward"]] = self._reward_zscore_.zscore
+
+        action_obs: numpy.ndarray = self._observations_[self._obs_layout_["action"]]
+        action_obs.fill(0)
         action_obs[self._action_] = 1
 
         # Combine market data with user stat
-        _concat_obs: numpy.ndarray = numpy.concatenate(
-            (portfolio_obs.squeeze(), reward_obs, action_obs, self._market_state_.obs)
-        )
-
-        _concat_obs: numpy.ndarray = numpy.array(_concat_obs, dtype=numpy.float32)
+        self._observations_[self._obs_layout_["market"]] = self._market_state_.obs
 
         # Check avaiable actions
-        action_mask: numpy.ndarray = \
-            numpy.array([1 for _ in range(NUM_ACTIONS)], dtype=numpy.int8)
+        self._action_mask_[:] = self._portfolio_manager_.avaiable_actions()
 
-        for i in range(NUM_ACTIONS):
-            can_rebalance, _ = self._portfolio_manager_.avaiable_action(i)
+        # No action
+        self._action_mask_[5] = 1
 
-            # No action
-            if can_rebalance is False and i != 5:
-                action_mask[i] = 0
-
-        return {
-            "action_mask": action_mask,
-            "observations": _concat_obs,
-        }
+        return self._obs_dict()
     
     def _reward_scheme(
         self,
@@ -187,7 +294,15 @@ class Simulator(gym.Env):
                 reward -= 4
 
             self._update_state(_action_, execute_result, reward, predicted_value)
-            return self.observation_state(), reward, True, {}
+
+            if self.configs.collect_step_detail and self.configs.ledger_dir:
+                self._write_ledger()
+
+            info = {}
+            if self._profiler_ is not None:
+                info["profile"] = self._profiler_.stats()
+
+            return self.observation_state(), reward, True, info
 
     @property
     def action_space(self):
@@ -195,24 +310,21 @@ class Simulator(gym.Env):
 
     @property
     def observation_space(self):
-        total = 39 # Portfolio, Reward, PrevAction, MarketObs
-
         return spaces.Dict(
             {
                 "action_mask": spaces.Box(0, 1, shape=(NUM_ACTIONS,), dtype=numpy.int8),
                 "observations": spaces.Box(
-                    low=numpy.array([-20 for _ in range(total)]),
-                    high=numpy.array([20 for _ in range(total)]),
-                    dtype=numpy.float32,
+                    low=-20, high=20, shape=(self._obs_size_,), dtype=numpy.float32
                 ),
             }
         )
 
     def reset(self, num_train_weeks_pct: float):
 
-        self._returns_collection_.clear()
-        self._reward_collection_.clear()
-        self._step_info_collection_.clear()
+        self._step_recorder_.clear()
+        self._num_episodes_ += 1
+        self._returns_zscore_.reset()
+        self._reward_zscore_.reset()
         self._compelete_ = False
         self._action_ = None
 
@@ -221,23 +333,40 @@ class Simulator(gym.Env):
             self._price_manager_.reset(num_train_weeks_pct=num_train_weeks_pct)
         self._portfolio_manager_.reset()
 
-        portfolio_obs = numpy.array([0, 0, 0, 0, 0, 0])
-        reward_obs = numpy.array([0])
-        action_obs = numpy.array([0 for _ in range(NUM_ACTIONS)])
-
         self._portfolio_manager_.update_market_price(self._market_state_.target_price)
 
-        _concat_obs = numpy.concatenate((portfolio_obs,
-                                         reward_obs,
-                                         action_obs,
-                                         self._market_state_.obs))
-        gc.collect()
+        self._observations_.fill(0)
+        self._observations_[self._obs_layout_["market"]] = self._market_state_.obs
+        self._action_mask_.fill(1)
+
+        return self._obs_dict()
+
+    def snapshot(self) -> SimulatorSnapshot:
+        """
+            Picklable copy of the episode state, `restore` rewinds this
+        Simulator (or one built with the same configs) to it. The market
+        state is looked up again from the price cursor. Step details
+        are rewound by length so they are only kept within the same episode.
+        """
+        return SimulatorSnapshot(
+            portfolio=self._portfolio_manager_.snapshot(),
+            price=self._price_manager_.snapshot(),
+            returns_zscore=self._returns_zscore_.snapshot(),
+            reward_zscore=self._reward_zscore_.snapshot(),
+            num_step_details=len(self._step_recorder_),
+            action=-1 if self._action_ is None else self._action_,
+            compelete=self._compelete_,
+        )
 
-        return {
-            "action_mask": numpy.array(object=[1 for _ in range(NUM_ACTIONS)],
-                                       dtype=numpy.int8),
-            "observations": _concat_obs,
-        }
+    def restore(self, snapshot: SimulatorSnapshot):
+        self._portfolio_manager_.restore(snapshot.portfolio)
+        self._price_manager_.restore(snapshot.price)
+        self._market_state_ = self._price_manager_.market_state
+        self._returns_zscore_.restore(snapshot.returns_zscore)
+        self._reward_zscore_.restore(snapshot.reward_zscore)
+        self._step_recorder_.rewind(snapshot.num_step_details)
+        self._action_ = None if snapshot.action < 0 else snapshot.action
+        self._compelete_ = bool(snapshot.compelete)
 
     @property
     def portfolio_return(self):
@@ -247,11 +376,14 @@ class Simulator(gym.Env):
 
         return pnl_value, pnl_pct
 
+    def _write_ledger(self):
+        ledger_dir = Path(self.configs.ledger_dir)
+        ledger_dir.mkdir(parents=True, exist_ok=True)
+
+        file_name = f"episode_{os.getpid()}_{self._num_episodes_}" \
+                    f"_week_{self._price_manager_._week_id_curr_}.parquet"
+        self._step_recorder_.write(str(ledger_dir / file_name))
+
     @property
     def trade_result(self):
-        trade_result_df = pandas.DataFrame(self._step_info_collection_)
-        trade_result_df["Date"] = \
-            trade_result_df["Date"].apply(
-            lambda x: datetime.utcfromtimestamp(float(x) / 1000)
-        )
-        return trade_result_df
\ No newline at end of file
+        return self._step_recorder_.to_dataframe()
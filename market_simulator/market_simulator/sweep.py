@@ -0,0 +1,129 @@
+import os
+import tempfile
+import numpy
+import pandas
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+from market_simulator.backtest import Backtester
+from market_simulator.core.data.dataset import TrainData
+from market_simulator.constant import NUM_ACTIONS
+
+# Candles of one week, enough actions for the longest episode
+WEEK_STEPS = 7 * 6 + 1
+
+# Hold action: a zero allocation leaves the positions untouched
+HOLD_ACTION = 0
+
+
+def _constant(action_id: int) -> numpy.ndarray:
+    return numpy.full(WEEK_STEPS, action_id, dtype=numpy.int64)
+
+
+def _periodic(action_id: int, period: int) -> numpy.ndarray:
+    """Rebalance to `action_id` every `period` candles, hold in between"""
+    actions = numpy.full(WEEK_STEPS, HOLD_ACTION, dtype=numpy.int64)
+    actions[::period] = action_id
+    return actions
+
+
+def strategies() -> Dict[str, numpy.ndarray]:
+    """
+        Name -> action sequence of every static strategy: each action every
+    candle (constant_*), daily (daily_*), every three days (3days_*) and
+    only at the open (buy_and_hold_*).
+    """
+    schedules: List[Tuple[str, Callable[[int], numpy.ndarray]]] = [
+        ("constant", _constant),
+        ("daily", lambda a: _periodic(a, 6)),
+        ("3days", lambda a: _periodic(a, 18)),
+        ("buy_and_hold", lambda a: _periodic(a, WEEK_STEPS)),
+    ]
+
+    return {
+        f"{name}_{action_id}": schedule(action_id)
+        for name, schedule in schedules
+        for action_id in range(1, NUM_ACTIONS)
+    }
+
+
+_backtester_: Backtester = None
+
+
+def _init_worker(symbols: List[str], bundle_path: str):
+    global _backtester_
+    _backtester_ = Backtester(TrainData(symbols=symbols, bundle_path=bundle_path))
+
+
+def _run_weeks(week_ids: List[int]) -> List[Tuple[int, Dict[str, float]]]:
+    _strategies_ = strategies()
+
+    rows = []
+    for week_id in week_ids:
+        returns = {}
+        for name, actions in _strategies_.items():
+            result = _backtester_.run(week_id, actions)
+            returns[name] = result.pnl[-1] / _backtester_.initial_equity
+
+        rows.append((week_id, returns))
+
+    return rows
+
+
+def summary(returns: pandas.DataFrame, weekly_performance: pandas.Series) -> pandas.DataFrame:
+    """Per strategy statistics of a week x strategy return matrix"""
+    return pandas.DataFrame({
+        "mean": returns.mean(),
+        "std": returns.std(),
+        "median": returns.median(),
+        "min": returns.min(),
+        "max": returns.max(),
+        "sharpe": returns.mean() / returns.std(),
+        "win_rate": (returns > 0).mean(),
+        "beat_week_rate": returns.gt(weekly_performance, axis=0).mean(),
+        "total": (1 + returns).prod() - 1,
+    }).sort_values("mean", ascending=False)
+
+
+def sweep(symbols: List[str],
+          output_path: str,
+          bundle_path: str = None,
+          num_workers: int = None,
+          chunk_size: int = 16) -> Tuple[pandas.DataFrame, pandas.DataFrame]:
+    """
+        Return of every static strategy on every week of TrainData, written
+    to `output_path` (Parquet, weeks x strategies) with the per strategy
+    summary next to it as `<name>_summary.parquet`.
+
+    Workers memory-map the dataset bundle at `bundle_path`, without one the
+    dataset is materialized once into a temporary bundle for the run.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if bundle_path is None:
+            bundle_path = os.path.join(tmp_dir, "bundle")
+            TrainData(symbols=symbols).materialize(bundle_path)
+
+        train_data = TrainData(symbols=symbols, bundle_path=bundle_path)
+        week_ids = list(range(train_data.total_week_id))
+        chunks = [week_ids[i:i + chunk_size] for i in range(0, len(week_ids), chunk_size)]
+
+        with ProcessPoolExecutor(max_workers=num_workers,
+                                 initializer=_init_worker,
+                                 initargs=(symbols, bundle_path)) as executor:
+            rows = [row for chunk in executor.map(_run_weeks, chunks) for row in chunk]
+
+        weekly_performance = pandas.Series(
+            train_data.get_weeks_performance(numpy.array(week_ids)), index=week_ids
+        )
+
+    returns = pandas.DataFrame.from_dict(dict(rows), orient="index").sort_index()
+    returns.index.name = "week_id"
+    returns.insert(0, "week_performance", weekly_performance)
+
+    stats = summary(returns.drop(columns="week_performance"), weekly_performance)
+
+    returns.to_parquet(output_path)
+    stats.to_parquet(f"{os.path.splitext(output_path)[0]}_summary.parquet")
+
+    return returns, stats
@@ -0,0 +1,214 @@
+import numpy
+import cython
+
+from market_simulator.core.assets.vector_portfolio import VectorPortfolioManager
+from market_simulator.core.data.market_price import VectorHistoricalPriceManager
+from market_simulator.common.running_stat import BatchRunningZScore
+from market_simulator.engine import SimulatorConfigurations, observation_layout
+from market_simulator.constant import NUM_ACTIONS
+
+from gym import spaces
+from typing import Dict
+
+
+class VectorSimulator:
+    """
+        N independent Simulator episodes stepped together. Portfolio state,
+    cursors and observations are (N, ...) arrays and every step is a fixed
+    number of NumPy operations regardless of N.
+
+    Observations and masks are returned as (N, obs_dim) and (N, NUM_ACTIONS)
+    arrays which are overwritten by the next `step`/`reset`.
+    """
+
+    def _as_mask(self, index) -> numpy.ndarray:
+        if index is None:
+            return numpy.ones(self.num_envs, dtype=bool)
+
+        mask = numpy.zeros(self.num_envs, dtype=bool)
+        mask[index] = True
+        return mask
+
+    def _update_state(
+        self,
+        trades_return: numpy.ndarray,
+        portfolio_value: numpy.ndarray,
+        assets_pnl: numpy.ndarray,
+        change_value: numpy.ndarray,
+        reward: numpy.ndarray,
+    ):
+        _returns_ = numpy.concatenate(
+            (trades_return, portfolio_value[:, None], assets_pnl, change_value[:, None]),
+            axis=1
+        )
+        self._returns_zscore_.update(_returns_)
+        self._reward_zscore_.update(reward)
+
+    def __init__(self, configs: Dict, num_envs: cython.int) -> None:
+        self.configs = SimulatorConfigurations(
+            symbols=['BTCUSDT', 'ETHUSDT'],
+            initial_equity=1500,
+            num_weeks_train=configs['num_weeks_train'],
+            evaluation=configs['evaluation'],
+            collect_step_detail=0,
+            ledger_dir=None,
+            reuse_obs_buffer=1,
+            dataset_bundle=configs.get('dataset_bundle'),
+            profile=0,
+            obs_cache_mb=0,
+            eval_weeks_only=0
+        )
+        self.num_envs: cython.int = num_envs
+        num_assets: cython.int = len(self.configs.symbols)
+
+        self._price_manager_ = VectorHistoricalPriceManager(
+                                    symbols=self.configs.symbols,
+                                    num_weeks_train=self.configs.num_weeks_train,
+                                    evaluation=self.configs.evaluation,
+                                    num_envs=num_envs,
+                                    bundle_path=self.configs.dataset_bundle
+        )
+
+        self._portfolio_manager_ = VectorPortfolioManager(
+                                    symbols=self.configs.symbols,
+                                    initial_equity=self.configs.initial_equity,
+                                    num_envs=num_envs
+        )
+
+        # TradesReturn, PortfolioValue, AssetsPnL, Change
+        self._returns_zscore_ = BatchRunningZScore(num_envs, 2 * num_assets + 2)
+        self._reward_zscore_ = BatchRunningZScore(num_envs, 1)
+
+        self._action_: numpy.ndarray = numpy.full(num_envs, -1, dtype=numpy.int64)
+        self._compelete_: numpy.ndarray = numpy.zeros(num_envs, dtype=bool)
+
+        num_market_features = self._price_manager_.train_data.num_market_features
+        self._market_obs_: numpy.ndarray = \
+            numpy.zeros((num_envs, num_market_features), dtype=numpy.float64)
+
+        self._obs_layout_ = observation_layout(num_assets, num_market_features)
+        self.obs_dim: cython.int = self._obs_layout_["market"].stop
+        self._observations_: numpy.ndarray = \
+            numpy.zeros((num_envs, self.obs_dim), dtype=numpy.float32)
+        self._action_mask_: numpy.ndarray = \
+            numpy.ones((num_envs, NUM_ACTIONS), dtype=numpy.int8)
+
+    def observation_state(self):
+
+        # Generate user stat
+        self._observations_[:, self._obs_layout_["portfolio"]] = self._returns_zscore_.zscore
+        self._observations_[:, self._obs_layout_["reward"]] = self._reward_zscore_.zscore
+
+        action_obs = self._observations_[:, self._obs_layout_["action"]]
+        action_obs.fill(0)
+        has_action = self._action_ >= 0
+        action_obs[has_action, self._action_[has_action]] = 1
+
+        # Combine market data with user stat
+        self._observations_[:, self._obs_layout_["market"]] = self._market_obs_
+
+        # Check avaiable actions, 5 is never masked like in Simulator
+        action_mask = self._portfolio_manager_.avaiable_actions()
+        action_mask[:, 5] = True
+        self._action_mask_[:] = action_mask
+
+        return {
+            "action_mask": self._action_mask_,
+            "observations": self._observations_,
+        }
+
+    def _reward_scheme(
+        self,
+        trades_return: numpy.ndarray,
+        assets_pnl: numpy.ndarray,
+    ) -> numpy.ndarray:
+        trades_return = trades_return.sum(axis=1)
+        assets_pnl = assets_pnl.sum(axis=1)
+
+        # Reward for total portfolio return
+        reward = numpy.where(assets_pnl < 0, -0.004, 0.004)
+
+        # Reward closing position
+        reward += numpy.where(trades_return < -0.001, -0.05, 0)
+        reward += numpy.where(trades_return > 0.001, 0.05, 0)
+
+        return reward
+
+    def step(self, actions: numpy.ndarray):
+        _actions_ = numpy.asarray(actions, dtype=numpy.int64).reshape(self.num_envs)
+        trades_return, _ = self._portfolio_manager_.execute_order(_actions_)
+        portfolio_value, assets_pnl, change_value = \
+            self._portfolio_manager_.portfolio_info
+
+        reward = self._reward_scheme(trades_return, assets_pnl)
+        self._action_[:] = _actions_
+
+        terminal = self._compelete_.copy()
+        pnl_value = portfolio_value - self.configs.initial_equity
+        pnl_pct = pnl_value / self.configs.initial_equity
+
+        if terminal.any():
+            bonus = numpy.where(pnl_pct > self._price_manager_.performance, 2, -2)
+            bonus += numpy.where(pnl_value > 20, 4, -4)
+            reward = numpy.where(terminal, reward + bonus, reward)
+
+        self._update_state(trades_return, portfolio_value, assets_pnl, change_value, reward)
+
+        running = ~terminal
+        if running.any():
+            _, market_obs, target_price, done = \
+                self._price_manager_.market_obs(running)
+            self._market_obs_[running] = market_obs
+            self._portfolio_manager_.update_market_price(target_price, running)
+            self._compelete_[running] = done | (pnl_value[running] < -30)
+
+        return self.observation_state(), reward, terminal, {}
+
+    @property
+    def action_space(self):
+        return spaces.Discrete(NUM_ACTIONS)
+
+    @property
+    def observation_space(self):
+        return spaces.Dict(
+            {
+                "action_mask": spaces.Box(0, 1, shape=(NUM_ACTIONS,), dtype=numpy.int8),
+                "observations": spaces.Box(
+                    low=-20, high=20, shape=(self.obs_dim,), dtype=numpy.float32
+                ),
+            }
+        )
+
+    def reset(self, num_train_weeks_pct: float, index=None):
+        """Reset the episodes selected by `index`, all of them when None"""
+
+        mask = self._as_mask(index)
+
+        self._returns_zscore_.reset(mask)
+        self._reward_zscore_.reset(mask)
+        self._compelete_[mask] = False
+        self._action_[mask] = -1
+
+        _, market_obs, target_price, _ = \
+            self._price_manager_.reset(num_train_weeks_pct=num_train_weeks_pct,
+                                       index=mask)
+        self._market_obs_[mask] = market_obs
+        self._portfolio_manager_.reset(mask)
+        self._portfolio_manager_.update_market_price(target_price, mask)
+
+        self._observations_[mask] = 0
+        self._observations_[mask, self._obs_layout_["market"]] = market_obs
+        self._action_mask_[mask] = 1
+
+        return {
+            "action_mask": self._action_mask_,
+            "observations": self._observations_,
+        }
+
+    @property
+    def portfolio_return(self):
+        portfolio_value, _, _ = self._portfolio_manager_.portfolio_info
+        pnl_value = portfolio_value - self.configs.initial_equity
+        pnl_pct = pnl_value / self.configs.initial_equity
+
+        return pnl_value, pnl_pct
@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+import numpy
+import pandas
+import pytest
+
+# Must be set before market_simulator is imported
+CACHE_DIR = tempfile.TemporaryDirectory(prefix="market_simulator-tests-")
+os.environ["MARKET_SIMULATOR_CACHE"] = CACHE_DIR.name
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT"]
+INTERVAL_MS = 4 * 3600 * 1000
+NUM_WEEKS = 40
+
+
+def pytest_unconfigure(config):
+    CACHE_DIR.cleanup()
+
+
+def synthetic_klines(num_rows: int, start_price: float, seed: int) -> pandas.DataFrame:
+    from market_simulator.core.data_feed.binance.constants import KLINE_COLUMNS, KLINE_DTYPES
+
+    rng = numpy.random.default_rng(seed)
+    open_time = 1609459200000 + numpy.arange(num_rows, dtype=numpy.int64) * INTERVAL_MS
+    close = start_price * numpy.exp(numpy.cumsum(rng.normal(0, 0.02, num_rows)))
+    open_price = numpy.r_[start_price, close[:-1]]
+
+    return pandas.DataFrame({
+        "open_time": open_time,
+        "open": open_price,
+        "high": numpy.maximum(open_price, close) * 1.01,
+        "low": numpy.minimum(open_price, close) * 0.99,
+        "close": close,
+        "volume": rng.random(num_rows) * 100,
+        "close_time": open_time + INTERVAL_MS - 1,
+        "quote_volume": rng.random(num_rows),
+        "count": rng.integers(1, 1000, num_rows),
+        "taker_buy_volume": rng.random(num_rows),
+        "taker_buy_quote_volume": rng.random(num_rows),
+        "ignore": 0,
+    }, columns=KLINE_COLUMNS).astype(KLINE_DTYPES)
+
+
+@pytest.fixture(scope="session")
+def klines():
+    """NUM_WEEKS weeks of synthetic 4h klines of SYMBOLS in the default KlineStore"""
+    from market_simulator.core.data_feed.kline_store import KlineStore
+
+    store = KlineStore()
+    num_rows = NUM_WEEKS * 7 * 6
+    for seed, (symbol, start_price) in enumerate(zip(SYMBOLS, [30000.0, 1500.0])):
+        store.write(symbol, "4h", synthetic_klines(num_rows, start_price, seed), archived=True)
+
+    return store
@@ -0,0 +1,62 @@
+import numpy
+import pytest
+
+from conftest import SYMBOLS
+from market_simulator.engine import Simulator
+from market_simulator.backtest import Backtester
+from market_simulator.constant import ACTION_TYPES
+
+
+@pytest.fixture(scope="module")
+def simulator(klines):
+    return Simulator({
+        "num_weeks_train": 2,
+        "evaluation": 1,
+        "show_trade_result": 1,
+        "eval_weeks_only": False,
+    })
+
+
+def per_asset(trade_result, name: str) -> numpy.ndarray:
+    """(steps, n_assets) values of the `<name>_<symbol>` columns"""
+    return numpy.column_stack([numpy.asarray(trade_result[f"{name}_{symbol}"]) for symbol in SYMBOLS])
+
+
+@pytest.mark.parametrize("week_id", [2, 5, 9, 13])
+def test_backtest_matches_simulator(simulator, week_id):
+    actions = numpy.random.default_rng(week_id).integers(0, 28, 7 * 6 + 1)
+
+    # Evaluation episodes replay week `num_weeks_train`
+    simulator._price_manager_.num_weeks_train = week_id
+    simulator.reset(1.0)
+    rewards, done, k = [], False, 0
+    while not done:
+        _, reward, done, _ = simulator.step(actions[k])
+        rewards.append(reward)
+        k += 1
+    trade_result = simulator.trade_result
+
+    result = Backtester(simulator._price_manager_.train_data).run(week_id, actions)
+
+    assert result.done == 1
+    numpy.testing.assert_array_equal(result.rewards, rewards)
+    numpy.testing.assert_array_equal(result.portfolio_value, trade_result["PortfolioValue"])
+    numpy.testing.assert_array_equal(result.pnl, trade_result["PortfolioValue"] - 1500.0)
+    numpy.testing.assert_array_equal(result.trades_return, per_asset(trade_result, "TradesReturn"))
+    numpy.testing.assert_array_equal(result.assets_pnl, per_asset(trade_result, "AssetsPnL"))
+    numpy.testing.assert_array_equal(
+        numpy.array(ACTION_TYPES)[result.actions_type], per_asset(trade_result, "ActionsType")
+    )
+
+
+def test_backtest_stops_when_actions_run_out(simulator):
+    result = Backtester(simulator._price_manager_.train_data).run(5, numpy.array([3, 7, 0]))
+
+    assert result.done == 0
+    assert len(result.rewards) == 3
+    assert result.actions.tolist() == [3, 7, 0]
+
+
+def test_backtest_rejects_unknown_actions(simulator):
+    with pytest.raises(ValueError):
+        Backtester(simulator._price_manager_.train_data).run(5, numpy.array([3, 28]))
@@ -0,0 +1,40 @@
+import os
+import sys
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+import market_simulator
+
+pytest.importorskip("Cython")
+
+PACKAGE_DIR = Path(market_simulator.__file__).parent
+
+
+def cythonize(module_path: Path, output_dir: Path) -> str:
+    """Cython errors of `module_path`, empty when it translates to C"""
+    output = output_dir / ".".join(module_path.relative_to(PACKAGE_DIR).with_suffix(".c").parts)
+    process = subprocess.run(
+        [sys.executable, "-m", "cython", "-3", str(module_path), "-o", str(output)],
+        capture_output=True,
+        text=True,
+    )
+
+    return "" if process.returncode == 0 else f"{module_path}:\n{process.stderr[-2000:]}"
+
+
+def test_modules_cythonize(tmp_path):
+    # The modules `setup.py build --cythonize` compiles
+    modules = sorted(
+        path for path in PACKAGE_DIR.rglob("*.py")
+        if path.stem not in ("__init__", "__main__") and "__pycache__" not in path.parts
+    )
+    if not modules:
+        pytest.skip(f"No module sources in {PACKAGE_DIR}, the package is already compiled")
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        errors = [error for error in executor.map(lambda path: cythonize(path, tmp_path), modules) if error]
+
+    assert not errors, "\n".join(errors)
@@ -0,0 +1,152 @@
+import warnings
+
+import numpy
+import pandas
+import pytest
+
+from conftest import synthetic_klines
+from market_simulator.core.data.dataset import TrainData
+from market_simulator.core.data_feed import feature_cache, kline_store
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT"]
+
+
+@pytest.fixture(scope="module")
+def train_data(klines):
+    return TrainData(symbols=SYMBOLS)
+
+
+def week_length(train_data: TrainData, week_id: int) -> int:
+    start, end = train_data._week_id_by_idx_[week_id]
+    return end - start + 1
+
+
+def test_get_market_states_matches_get_market_state(train_data):
+    for week_id in range(2, train_data.total_week_id):
+        trade_time_ids = numpy.arange(week_length(train_data, week_id))
+        _, obs, target_prices, done = train_data.get_market_states(
+            numpy.full(len(trade_time_ids), week_id), trade_time_ids
+        )
+
+        for i in trade_time_ids:
+            state = train_data.get_market_state(week_id, i)
+            numpy.testing.assert_allclose(obs[i], state.obs, rtol=1e-6, equal_nan=True)
+            assert list(target_prices[i]) == list(state.target_price.values())
+            assert done[i] == state.done
+
+
+def test_obs_cache_matches_uncached(klines, train_data):
+    cached = TrainData(symbols=SYMBOLS, obs_cache_bytes=16 * 1024 * 1024)
+
+    for week_id in range(2, cached.total_week_id):
+        for i in range(week_length(cached, week_id)):
+            state = cached.get_market_state(week_id, i)
+            expected = train_data.get_market_state(week_id, i)
+            numpy.testing.assert_allclose(state.obs, expected.obs, rtol=1e-6, equal_nan=True)
+            assert state.target_price == expected.target_price
+            assert state.done == expected.done
+
+    assert cached.obs_cache_stats()["misses"] == cached.total_week_id - 2
+
+
+def assert_same_market_states(train_data: TrainData, expected: TrainData, rtol: float = 0):
+    assert train_data.total_week_id == expected.total_week_id
+    for week_id in range(2, expected.total_week_id):
+        for i in range(week_length(expected, week_id)):
+            state = train_data.get_market_state(week_id, i)
+            expected_state = expected.get_market_state(week_id, i)
+            numpy.testing.assert_allclose(state.obs, expected_state.obs, rtol=rtol, equal_nan=True)
+            assert state.target_price == expected_state.target_price
+            assert state.trading_time == expected_state.trading_time
+
+
+def test_materialize_swaps_the_bundle(train_data, tmp_path):
+    bundle_path = str(tmp_path / "bundle")
+    train_data.materialize(bundle_path)
+    opened = TrainData(symbols=SYMBOLS, bundle_path=bundle_path)
+    assert_same_market_states(opened, train_data)
+
+    for _ in range(2):
+        train_data.materialize(bundle_path)
+
+    # The link points at the last version, the previous one is kept for readers opening it
+    assert (tmp_path / "bundle").is_symlink()
+    versions = sorted(path.name for path in tmp_path.iterdir() if path.name != "bundle")
+    assert len(versions) == 2
+    assert (tmp_path / "bundle").resolve().name == versions[-1]
+
+    # Memory-mapped arrays of a removed version stay readable
+    assert_same_market_states(opened, train_data)
+    assert_same_market_states(TrainData(symbols=SYMBOLS, bundle_path=bundle_path), train_data)
+
+
+def test_materialize_replaces_a_bundle_directory(train_data, tmp_path):
+    (tmp_path / "bundle").mkdir()
+    (tmp_path / "bundle" / "meta.json").write_text("{}")
+
+    train_data.materialize(str(tmp_path / "bundle"))
+
+    assert (tmp_path / "bundle").is_symlink()
+    assert_same_market_states(TrainData(symbols=SYMBOLS, bundle_path=str(tmp_path / "bundle")),
+                              train_data)
+
+
+def test_missing_bundle_raises(klines, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        TrainData(symbols=SYMBOLS, bundle_path=str(tmp_path / "bundle"))
+
+
+def test_stale_bundle_warns(train_data, tmp_path, monkeypatch):
+    bundle_path = str(tmp_path / "bundle")
+    train_data.materialize(bundle_path)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        TrainData(symbols=SYMBOLS, bundle_path=bundle_path)
+
+    # New klines were stored since
+    monkeypatch.setattr(feature_cache, "fingerprint", lambda symbols, interval: "updated")
+    with pytest.warns(UserWarning, match="older than the stored klines"):
+        TrainData(symbols=SYMBOLS, bundle_path=bundle_path)
+
+
+def assert_same_arrays(train_data: TrainData, expected: TrainData, rtol: float):
+    pandas.testing.assert_frame_equal(train_data._dataset_, expected._dataset_, rtol=rtol)
+    assert train_data._week_id_by_idx_ == expected._week_id_by_idx_
+    assert train_data._weekly_performance_ == expected._weekly_performance_
+
+    arrays = train_data._bundle_arrays()
+    for name, array in expected._bundle_arrays().items():
+        assert arrays[name].dtype == array.dtype, name
+        numpy.testing.assert_allclose(arrays[name], array, rtol=rtol, equal_nan=True, err_msg=name)
+
+
+@pytest.mark.parametrize("num_rows", [1, 5, 84, 200])
+def test_refresh_extends_like_a_rebuild(tmp_path, monkeypatch, num_rows):
+    # 20 weeks, other klines than the session store and its cached features
+    full = [synthetic_klines(20 * 7 * 6, start_price, seed)
+            for seed, start_price in [(10, 30000.0), (11, 1500.0)]]
+
+    def write(root: str, rows: slice):
+        monkeypatch.setattr(kline_store, "KLINES_PATH", str(tmp_path / root))
+        for symbol, df in zip(SYMBOLS, full):
+            kline_store.KlineStore().write(symbol, "4h", df.iloc[rows], archived=True)
+
+    write("full", slice(None))
+    # An earlier parameter cached the extended dataset under the same fingerprint
+    feature_cache.invalidate(feature_cache.fingerprint(SYMBOLS, "4h"))
+    expected = TrainData(symbols=SYMBOLS)
+
+    write("extended", slice(None, -num_rows))
+    train_data = TrainData(symbols=SYMBOLS)
+    write("extended", slice(-num_rows, None))
+
+    def rebuild(*args, **kwargs):
+        pytest.fail("refresh rebuilt the dataset instead of extending it")
+
+    monkeypatch.setattr(TrainData, "_build", rebuild)
+    train_data.refresh()
+
+    # Rolling sums restarted on the tail only differ in the last bits
+    assert_same_arrays(train_data, expected, rtol=1e-9)
+    assert_same_market_states(train_data, expected, rtol=1e-9)
@@ -0,0 +1,146 @@
+import io
+import json
+import zipfile
+import hashlib
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from market_simulator.core.data_feed.common.archive_manifest import ArchiveManifest
+from market_simulator.core.data_feed.common.downloader import ConcurrentDownloader
+
+ZIP_PATH = "/data/spot/monthly/klines/BTCUSDT/4h/BTCUSDT-4h-2021-01.zip"
+
+
+def zip_archive(name: str, content: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr(name, content)
+
+    return buffer.getvalue()
+
+
+def checksum_file(body: bytes, name: str) -> bytes:
+    return f"{hashlib.sha256(body).hexdigest()}  {name}\n".encode()
+
+
+class ArchiveServer(ThreadingHTTPServer):
+    """
+        Serves the (status, body) responses queued for each path in order,
+    the last one repeated, and counts the requests of every path.
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ArchiveHandler)
+        self.routes = {}
+        self.hits = Counter()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits[self.path] += 1
+        responses = self.server.routes.get(self.path, [(404, b"")])
+        status, body = responses.pop(0) if len(responses) > 1 else responses[0]
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ArchiveServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def downloader(**configs) -> ConcurrentDownloader:
+    return ConcurrentDownloader(rate=1000, burst=10, backoff=0.01, **configs)
+
+
+def test_server_error_is_retried(server, tmp_path):
+    body = zip_archive("BTCUSDT-4h-2021-01.csv", b"1609459200000,1,2,0.5,1.5\n")
+    server.routes[ZIP_PATH] = [(503, b""), (503, b""), (200, body)]
+    server.routes[f"{ZIP_PATH}.CHECKSUM"] = [(200, checksum_file(body, "BTCUSDT-4h-2021-01.zip"))]
+    file_path = str(tmp_path / "BTCUSDT-4h-2021-01.zip")
+    manifest = ArchiveManifest(str(tmp_path / "manifest.json"))
+
+    results = downloader(max_retries=3, manifest=manifest).download([(server.base_url + ZIP_PATH, file_path)])
+
+    assert results == {file_path: True}
+    assert server.hits[ZIP_PATH] == 3
+    with open(file_path, "rb") as f:
+        assert f.read() == body
+
+    with open(manifest.manifest_path) as f:
+        entry = json.load(f)["BTCUSDT-4h-2021-01.zip"]
+    assert entry["sha256"] == hashlib.sha256(body).hexdigest()
+    assert entry["verified"]
+    assert manifest.is_complete(file_path)
+
+
+def test_server_error_gives_up_after_max_retries(server, tmp_path):
+    server.routes[ZIP_PATH] = [(503, b"")]
+    file_path = str(tmp_path / "BTCUSDT-4h-2021-01.zip")
+
+    results = downloader(max_retries=2).download([(server.base_url + ZIP_PATH, file_path)])
+
+    assert results == {file_path: False}
+    assert server.hits[ZIP_PATH] == 3
+    assert not (tmp_path / "BTCUSDT-4h-2021-01.zip").exists()
+
+
+def test_missing_file_is_not_retried(server, tmp_path):
+    file_path = str(tmp_path / "BTCUSDT-4h-2021-01.zip")
+
+    results = downloader(max_retries=3).download([(server.base_url + ZIP_PATH, file_path)])
+
+    assert results == {file_path: False}
+    assert server.hits[ZIP_PATH] == 1
+    assert server.hits[f"{ZIP_PATH}.CHECKSUM"] == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_checksum_mismatch_deletes_the_file(server, tmp_path):
+    body = zip_archive("BTCUSDT-4h-2021-01.csv", b"1609459200000,1,2,0.5,1.5\n")
+    server.routes[ZIP_PATH] = [(200, body)]
+    server.routes[f"{ZIP_PATH}.CHECKSUM"] = [(200, checksum_file(b"other", "BTCUSDT-4h-2021-01.zip"))]
+    file_path = str(tmp_path / "BTCUSDT-4h-2021-01.zip")
+    manifest = ArchiveManifest(str(tmp_path / "manifest.json"))
+
+    results = downloader(max_retries=1, manifest=manifest).download([(server.base_url + ZIP_PATH, file_path)])
+
+    # Every attempt downloads the file again
+    assert results == {file_path: False}
+    assert server.hits[ZIP_PATH] == 2
+    assert server.hits[f"{ZIP_PATH}.CHECKSUM"] == 2
+    assert list(tmp_path.iterdir()) == []
+    assert not manifest.is_complete(file_path)
+
+
+def test_checksum_mismatch_is_retried(server, tmp_path):
+    body = zip_archive("BTCUSDT-4h-2021-01.csv", b"1609459200000,1,2,0.5,1.5\n")
+    server.routes[ZIP_PATH] = [(200, b"truncated"), (200, body)]
+    server.routes[f"{ZIP_PATH}.CHECKSUM"] = [(200, checksum_file(body, "BTCUSDT-4h-2021-01.zip"))]
+    file_path = str(tmp_path / "BTCUSDT-4h-2021-01.zip")
+
+    results = downloader(max_retries=3).download([(server.base_url + ZIP_PATH, file_path)])
+
+    assert results == {file_path: True}
+    assert server.hits[ZIP_PATH] == 2
+    with open(file_path, "rb") as f:
+        assert f.read() == body
@@ -0,0 +1,128 @@
+import pickle
+
+import numpy
+import pytest
+
+from market_simulator.engine import Simulator
+
+
+def run_episode(simulator: Simulator, action: int) -> float:
+    simulator.reset(1.0)
+    total_reward, done = 0.0, False
+    while not done:
+        _, reward, done, _ = simulator.step(action)
+        total_reward += reward
+
+    return total_reward
+
+
+def eval_simulator(**configs) -> Simulator:
+    return Simulator({"num_weeks_train": 10, "evaluation": 1, "show_trade_result": 0, **configs})
+
+
+@pytest.mark.parametrize("obs_cache_mb", [0, 16])
+def test_replay_week(klines, obs_cache_mb):
+    simulator = eval_simulator(obs_cache_mb=obs_cache_mb)
+
+    rewards = [run_episode(simulator, action=5) for _ in range(3)]
+
+    assert rewards == pytest.approx([rewards[0]] * 3)
+
+
+def test_obs_cache_matches_uncached(klines):
+    uncached = eval_simulator(obs_cache_mb=0)
+    cached = eval_simulator(obs_cache_mb=16)
+
+    expected = run_episode(uncached, action=5)
+    for _ in range(2):
+        assert run_episode(cached, action=5) == pytest.approx(expected)
+
+
+def test_trade_result_outlives_episode(klines):
+    simulator = eval_simulator(show_trade_result=1)
+
+    run_episode(simulator, action=5)
+    trade_result = simulator.trade_result
+    expected = trade_result.copy()
+
+    trade_result["Reward"] = 0.0
+    trade_result.loc[0, "PortfolioValue"] = -1.0
+    assert simulator.trade_result.equals(expected)
+
+    trade_result = simulator.trade_result
+    run_episode(simulator, action=9)
+    assert trade_result.equals(expected)
+
+
+
+def replay(simulator: Simulator, actions) -> tuple:
+    rewards, observations = [], []
+    for action in actions:
+        obs, reward, done, _ = simulator.step(action)
+        rewards.append(reward)
+        observations.append(obs["observations"].copy())
+        if done:
+            break
+
+    return rewards, numpy.array(observations)
+
+
+def train_simulator(**configs) -> Simulator:
+    return Simulator({"num_weeks_train": 10, "evaluation": 0, "show_trade_result": 1, **configs})
+
+
+@pytest.mark.parametrize("obs_cache_mb", [0, 16])
+def test_restore_replays_episode(klines, obs_cache_mb):
+    simulator = train_simulator(obs_cache_mb=obs_cache_mb)
+    actions = numpy.random.default_rng(0).integers(0, 28, 20)
+
+    simulator.reset(1.0)
+    replay(simulator, actions[:5])
+    snapshot = pickle.loads(pickle.dumps(simulator.snapshot()))
+    rewards, observations = replay(simulator, actions[5:])
+    trade_result = simulator.trade_result
+
+    for _ in range(2):
+        simulator.restore(snapshot)
+        replayed_rewards, replayed_observations = replay(simulator, actions[5:])
+        assert replayed_rewards == rewards
+        numpy.testing.assert_array_equal(replayed_observations, observations)
+        assert simulator.trade_result.equals(trade_result)
+
+
+def test_restore_after_reset(klines):
+    simulator = train_simulator()
+    actions = numpy.random.default_rng(1).integers(0, 28, 100)
+
+    simulator.reset(1.0)
+    replay(simulator, actions[:3])
+    snapshot = simulator.snapshot()
+    rewards, observations = replay(simulator, actions[3:])
+
+    # The next episodes sample other weeks from the restored RNG state
+    simulator.reset(1.0)
+    next_week_id = simulator._price_manager_._week_id_curr_
+    replay(simulator, actions[:7])
+
+    simulator.restore(snapshot)
+    replayed_rewards, replayed_observations = replay(simulator, actions[3:])
+    assert replayed_rewards == rewards
+    numpy.testing.assert_array_equal(replayed_observations, observations)
+
+    simulator.reset(1.0)
+    assert simulator._price_manager_._week_id_curr_ == next_week_id
+
+
+def test_snapshot_is_compact(klines):
+    simulator = train_simulator(show_trade_result=0)
+    simulator.reset(1.0)
+    simulator.step(3)
+    first_size = len(pickle.dumps(simulator.snapshot()))
+
+    done = False
+    while not done:
+        _, _, done, _ = simulator.step(3)
+
+    # Fixed-size state, the snapshot does not grow with the episode
+    assert len(pickle.dumps(simulator.snapshot())) == first_size
+    assert first_size < 640
@@ -0,0 +1,47 @@
+import numpy
+import pandas
+import pytest
+
+from conftest import SYMBOLS, NUM_WEEKS, synthetic_klines
+from market_simulator.core.data_feed import fetch_data
+from market_simulator.core.data_feed.kline_store import KlineStore
+from market_simulator.core.data_feed.load import unify_symbols
+
+ROWS_PER_WEEK = 7 * 6
+
+
+@pytest.fixture(scope="module")
+def gappy_store(tmp_path_factory):
+    """Synthetic klines with 3 ETHUSDT candles missing in week 11"""
+    store = KlineStore(str(tmp_path_factory.mktemp("klines")))
+    num_rows = NUM_WEEKS * ROWS_PER_WEEK
+    for seed, (symbol, start_price) in enumerate(zip(SYMBOLS, [30000.0, 1500.0])):
+        df = synthetic_klines(num_rows, start_price, seed)
+        if symbol == "ETHUSDT":
+            df = df.drop(index=range(11 * ROWS_PER_WEEK + 10, 11 * ROWS_PER_WEEK + 13))
+        store.write(symbol, "4h", df, archived=True)
+
+    return store
+
+
+def test_shared_open_time(gappy_store):
+    open_time = unify_symbols.shared_open_time(SYMBOLS, store=gappy_store)
+    df = unify_symbols.unify(SYMBOLS, store=gappy_store)
+
+    assert len(open_time) == NUM_WEEKS * ROWS_PER_WEEK - 3
+    assert open_time.tolist() == df["open_time"].tolist()
+
+
+@pytest.mark.parametrize("first_week, last_week", [(10, 12), (9, 11), (-3, -1)])
+def test_generate_weeks_dataset(gappy_store, first_week, last_week):
+    full = fetch_data.generate_dataset(SYMBOLS, use_cache=False, store=gappy_store)
+    week_index = full["week_id"] - full["week_id"].iloc[0]
+
+    df, first, last = fetch_data.generate_weeks_dataset(
+        SYMBOLS, first_week, last_week, store=gappy_store
+    )
+
+    # The weeks and the first row after them
+    rows = numpy.flatnonzero((week_index >= first) & (week_index <= last))
+    expected = full.iloc[rows[0]:min(rows[-1] + 2, len(full))].reset_index(drop=True)
+    pandas.testing.assert_frame_equal(df, expected[df.columns], check_exact=False, rtol=1e-6)
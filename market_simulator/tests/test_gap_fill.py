@@ -0,0 +1,172 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy
+import pandas
+import pytest
+
+from conftest import INTERVAL_MS, synthetic_klines
+from market_simulator.core.data_feed.binance.gap_fill import (
+    KLINES_LIMIT,
+    KlineGapFiller,
+    find_gaps,
+    interval_ms,
+    pages,
+)
+from market_simulator.core.data_feed.kline_store import KlineStore
+
+START = 1609459200000
+
+
+def open_times(num_rows: int, start: int = START) -> numpy.ndarray:
+    return start + numpy.arange(num_rows, dtype=numpy.int64) * INTERVAL_MS
+
+
+def test_interval_ms():
+    assert interval_ms("4h") == INTERVAL_MS
+    assert interval_ms("15m") == 15 * 60 * 1000
+    with pytest.raises(ValueError):
+        interval_ms("1M")
+
+
+def test_find_gaps_without_gap():
+    open_time = open_times(100)
+
+    assert find_gaps(open_time[:0], INTERVAL_MS, end_time=START) == []
+    assert find_gaps(open_time, INTERVAL_MS) == []
+    assert find_gaps(open_time, INTERVAL_MS, end_time=int(open_time[-1])) == []
+    # The next candle has not opened yet
+    assert find_gaps(open_time, INTERVAL_MS, end_time=int(open_time[-1]) + INTERVAL_MS - 1) == []
+
+
+def test_find_gaps():
+    open_time = numpy.delete(open_times(100), [10, 50, 51, 52])
+
+    assert find_gaps(open_time, INTERVAL_MS) == [
+        (START + 10 * INTERVAL_MS, START + 10 * INTERVAL_MS),
+        (START + 50 * INTERVAL_MS, START + 52 * INTERVAL_MS),
+    ]
+
+
+def test_find_gaps_tail():
+    open_time = open_times(100)
+    last = int(open_time[-1])
+
+    assert find_gaps(open_time, INTERVAL_MS, end_time=last + INTERVAL_MS) == \
+        [(last + INTERVAL_MS, last + INTERVAL_MS)]
+    # end_time within a candle ends the gap there
+    assert find_gaps(open_time, INTERVAL_MS, end_time=last + 3 * INTERVAL_MS + 1) == \
+        [(last + INTERVAL_MS, last + 3 * INTERVAL_MS + 1)]
+
+
+def test_pages():
+    first = START
+    exact = first + (KLINES_LIMIT - 1) * INTERVAL_MS
+
+    assert pages([], INTERVAL_MS) == []
+    assert pages([(first, first)], INTERVAL_MS) == [(first, first)]
+    # A gap of exactly KLINES_LIMIT candles is one page, one more candle needs a second
+    assert pages([(first, exact)], INTERVAL_MS) == [(first, exact)]
+    assert pages([(first, exact + INTERVAL_MS)], INTERVAL_MS) == [
+        (first, exact),
+        (exact + INTERVAL_MS, exact + INTERVAL_MS),
+    ]
+    assert pages([(first, exact), (exact + 2 * INTERVAL_MS, exact + 3 * INTERVAL_MS)], INTERVAL_MS) == \
+        [(first, exact), (exact + 2 * INTERVAL_MS, exact + 3 * INTERVAL_MS)]
+
+
+class KlinesServer(ThreadingHTTPServer):
+    """
+        /api/v3/klines of `klines`, answered like the REST API. The first
+    `errors` requests fail with HTTP 500.
+    """
+
+    def __init__(self, klines: pandas.DataFrame, errors: int = 0):
+        super().__init__(("127.0.0.1", 0), KlinesHandler)
+        self.klines = klines
+        self.errors = errors
+        self.requests = []
+        self._lock_ = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class KlinesHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        with self.server._lock_:
+            self.server.requests.append(query)
+            fail = self.server.errors > 0
+            self.server.errors -= fail
+
+        if url.path != "/api/v3/klines" or fail:
+            status, body = (404 if not fail else 500), {"code": -1, "msg": "stub error"}
+        else:
+            klines = self.server.klines
+            rows = klines[(klines["open_time"] >= int(query["startTime"]))
+                          & (klines["open_time"] <= int(query["endTime"]))]
+            # The API returns prices and volumes as strings
+            status, body = 200, [
+                [value if isinstance(value, int) else repr(value) for value in row]
+                for row in rows.head(int(query["limit"])).to_dict("split")["data"]
+            ]
+
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def klines_server():
+    server = KlinesServer(synthetic_klines(1500, 30000.0, seed=0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("errors", [0, 1])
+def test_fill(klines_server, tmp_path, errors):
+    full = synthetic_klines(1500, 30000.0, seed=0)
+    # A single candle, a gap of KLINES_LIMIT + 1 candles and 5 candles at the end
+    missing = [20] + list(range(100, 100 + KLINES_LIMIT + 1)) + list(range(1495, 1500))
+    store = KlineStore(str(tmp_path))
+    store.write("BTCUSDT", "4h", full.drop(index=missing), archived=True)
+    klines_server.errors = errors
+    filler = KlineGapFiller(base_url=klines_server.base_url, rate=1000, burst=10, backoff=0.01)
+
+    filled = filler.fill("BTCUSDT", "4h", store, end_time=int(full["open_time"].iloc[-1]))
+
+    assert filled == len(missing)
+    assert len(klines_server.requests) == 4 + errors
+    pandas.testing.assert_frame_equal(store.read("BTCUSDT", "4h"), full)
+
+    # Nothing is missing anymore
+    assert filler.fill("BTCUSDT", "4h", store, end_time=int(full["open_time"].iloc[-1])) == 0
+    assert len(klines_server.requests) == 4 + errors
+
+
+def test_fill_gives_up_after_max_retries(klines_server, tmp_path):
+    full = synthetic_klines(1500, 30000.0, seed=0)
+    store = KlineStore(str(tmp_path))
+    store.write("BTCUSDT", "4h", full.drop(index=range(10, 20)), archived=True)
+    klines_server.errors = 100
+    filler = KlineGapFiller(base_url=klines_server.base_url, max_retries=2, rate=1000,
+                            burst=10, backoff=0.01)
+
+    assert filler.fill("BTCUSDT", "4h", store, end_time=int(full["open_time"].iloc[-1])) == 0
+    assert len(klines_server.requests) == 3
+    assert len(store.read("BTCUSDT", "4h")) == 1490
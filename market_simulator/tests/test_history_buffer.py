@@ -0,0 +1,80 @@
+import tracemalloc
+
+import numpy
+
+from market_simulator.common import history_buffer
+from market_simulator.common.history_buffer import HistoryBuffer
+from market_simulator.constant import EPISODE_CAPACITY
+from test_engine import eval_simulator, run_episode
+
+
+def allocated_blocks(func, module=None) -> int:
+    """
+        Net count of memory blocks `func` leaves allocated, only those
+    allocated from the Python code of `module` when given
+    """
+    func()  # Warm up
+    tracemalloc.start(32)
+    try:
+        before = tracemalloc.take_snapshot()
+        func()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    return sum(
+        stat.count_diff
+        for stat in after.compare_to(before, "traceback")
+        if stat.traceback[-1].filename != tracemalloc.__file__
+        and (module is None or any(frame.filename == module.__file__ for frame in stat.traceback))
+    )
+
+
+def test_append_and_clear_do_not_allocate():
+    buffer = HistoryBuffer(width=6, capacity=EPISODE_CAPACITY)
+    row = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+
+    def episode():
+        buffer.clear()
+        for _ in range(EPISODE_CAPACITY):
+            buffer.append(row)
+
+    assert allocated_blocks(episode) == 0
+    assert buffer.capacity == EPISODE_CAPACITY
+
+
+def test_append_grows_past_capacity():
+    buffer = HistoryBuffer(width=2, capacity=4)
+    for i in range(9):
+        buffer.append([i, -i])
+
+    assert buffer.capacity == 16
+    numpy.testing.assert_array_equal(buffer.values, [[i, -i] for i in range(9)])
+    assert buffer.values.dtype == numpy.float32
+
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.capacity == 16
+
+
+def test_snapshot_restore_rewind():
+    buffer = HistoryBuffer(width=2, capacity=4)
+    for i in range(3):
+        buffer.append([i, i])
+    data = buffer.snapshot()
+
+    restored = HistoryBuffer(width=2, capacity=2)
+    restored.restore(data)
+    numpy.testing.assert_array_equal(restored.values, buffer.values)
+
+    buffer.rewind(1)
+    numpy.testing.assert_array_equal(buffer.values, [[0, 0]])
+
+
+def test_episode_history_does_not_allocate(klines):
+    simulator = eval_simulator(show_trade_result=1)
+    columns = simulator._step_recorder_._columns_
+    buffers = {name: column._buffer_ for name, column in columns.items()}
+
+    # Other step allocations (market states, observations) are freed by the next step
+    assert allocated_blocks(lambda: run_episode(simulator, action=5), history_buffer) == 0
+    assert all(columns[name]._buffer_ is buffer for name, buffer in buffers.items())
@@ -0,0 +1,94 @@
+import numpy
+from scipy.stats import zscore
+
+from market_simulator.common.running_stat import (
+    BatchRunningZScore,
+    RunningZScore,
+    merge_moments,
+)
+
+
+def samples(num_rows: int = 200, seed: int = 0) -> numpy.ndarray:
+    rng = numpy.random.default_rng(seed)
+    X = rng.normal(0, 1, (num_rows, 5)) * [1, 10, 1e-3, 1e4, 1]
+    X[:, 1] = 3.5                      # Constant column
+    X[50:, 4] = X[49, 4]               # Constant after a while
+    X[:, 2] = numpy.round(X[:, 2], 4)  # Repeated values
+
+    return X
+
+
+def test_running_zscore_matches_scipy():
+    X = samples()
+    running = RunningZScore(size=X.shape[1])
+
+    for t in range(len(X)):
+        expected = numpy.nan_to_num(zscore(X[:t + 1])[-1])
+        numpy.testing.assert_allclose(running.update(X[t]), expected, rtol=1e-7, atol=1e-9)
+
+
+def test_running_zscore_constant_columns():
+    running = RunningZScore(size=3)
+
+    for value in [1.0, 1.0, 1.0]:
+        assert running.update([value, 0.0, -7.0]).tolist() == [0, 0, 0]
+
+
+def test_running_zscore_reset_snapshot_restore():
+    X = samples(seed=1)
+    running = RunningZScore(size=X.shape[1])
+    for x in X[:20]:
+        running.update(x)
+    state = running.snapshot()
+
+    expected = [running.update(x).copy() for x in X[20:40]]
+    running.restore(state)
+    numpy.testing.assert_array_equal([running.update(x).copy() for x in X[20:40]], expected)
+
+    running.reset()
+    numpy.testing.assert_allclose(running.update(X[0]), numpy.zeros(X.shape[1]))
+    assert running.count == 1
+
+
+def test_batch_running_zscore_matches_running_zscore():
+    streams = [samples(seed=seed) for seed in range(3)]
+    batch = BatchRunningZScore(num_envs=3, size=5)
+    runnings = [RunningZScore(size=5) for _ in streams]
+
+    for t in range(len(streams[0])):
+        zscores = batch.update(numpy.stack([X[t] for X in streams]))
+        for env, (X, running) in enumerate(zip(streams, runnings)):
+            numpy.testing.assert_allclose(zscores[env], running.update(X[t]), rtol=1e-9, atol=1e-12)
+
+
+def test_merge_moments():
+    X = samples(seed=2)
+    a, b = X[:70], X[70:]
+
+    count, mean, m2 = merge_moments(len(a), a.mean(axis=0), a.var(axis=0) * len(a),
+                                    len(b), b.mean(axis=0), b.var(axis=0) * len(b))
+
+    assert count == len(X)
+    numpy.testing.assert_allclose(mean, X.mean(axis=0))
+    numpy.testing.assert_allclose(m2, X.var(axis=0) * len(X), atol=1e-9)
+
+
+def test_merge_moments_batched_counts():
+    X = samples(seed=3)
+    splits = [10, 70, 150]
+    a = [X[:s] for s in splits]
+    b = [X[s:] for s in splits]
+
+    count, mean, m2 = merge_moments(
+        numpy.array([[len(x)] for x in a]),
+        numpy.stack([x.mean(axis=0) for x in a]),
+        numpy.stack([x.var(axis=0) * len(x) for x in a]),
+        numpy.array([[len(x)] for x in b]),
+        numpy.stack([x.mean(axis=0) for x in b]),
+        numpy.stack([x.var(axis=0) * len(x) for x in b]),
+    )
+
+    assert count[:, 0].tolist() == [len(X)] * len(splits)
+    numpy.testing.assert_allclose(mean, numpy.tile(X.mean(axis=0), (len(splits), 1)))
+    numpy.testing.assert_allclose(m2, numpy.tile(X.var(axis=0) * len(X), (len(splits), 1)),
+                                  atol=1e-9)
@@ -0,0 +1,64 @@
+import numpy
+import pandas
+
+from conftest import SYMBOLS
+from market_simulator.common.step_recorder import StepRecorder
+from market_simulator.constant import ACTION_ALLOCATION, ACTION_TYPE_CODES
+
+
+def recorder(num_steps: int) -> StepRecorder:
+    step_recorder = StepRecorder(symbols=SYMBOLS, capacity=4)
+    for k in range(num_steps):
+        step_recorder.record(
+            trading_time=1609459200000 + k * 4 * 3600 * 1000,
+            action=k % 28,
+            actions_type=[ACTION_TYPE_CODES["OPEN_NEW"], ACTION_TYPE_CODES["HOLD"]],
+            reward=0.5 * k,
+            predicted_reward=0.0,
+            target_prices=[30000.0 + k, 1500.0 + k],
+            avg_prices=[30000.0, 1500.0],
+            sizes=[0.01 * k, -0.1 * k],
+            trades_return=[-0.1, 0.0],
+            portfolio_value=1500.0 + k,
+            assets_pnl=[float(k), -float(k)],
+            change=0.0,
+        )
+
+    return step_recorder
+
+
+def test_to_dataframe():
+    df = recorder(num_steps=6).to_dataframe()
+
+    assert len(df) == 6
+    assert df["Date"].iloc[1] == pandas.Timestamp("2021-01-01 04:00")
+    assert df["Action"].tolist() == list(range(6))
+    assert df["Allocation_ETHUSDT"].tolist() == ACTION_ALLOCATION[:6, 1].tolist()
+    assert df["ActionsType_BTCUSDT"].tolist() == ["OPEN_NEW"] * 6
+    assert df["ActionsType_ETHUSDT"].tolist() == ["HOLD"] * 6
+    numpy.testing.assert_array_equal(df["Sizes_ETHUSDT"], -0.1 * numpy.arange(6))
+    numpy.testing.assert_array_equal(df["TargetPrices_BTCUSDT"], 30000.0 + numpy.arange(6))
+
+
+def test_to_dataframe_without_copy_shares_the_buffers():
+    step_recorder = recorder(num_steps=3)
+    df = step_recorder.to_dataframe(copy=False)
+    sizes = step_recorder._columns_["Sizes"].values
+
+    for column in ["Sizes_BTCUSDT", "Sizes_ETHUSDT", "Reward", "ActionsType_BTCUSDT"]:
+        values = df[column].cat.codes if column.startswith("ActionsType") else df[column]
+        assert numpy.shares_memory(values.to_numpy(), step_recorder._columns_[column.split("_")[0]].values)
+
+    assert not numpy.shares_memory(step_recorder.to_dataframe()["Sizes_BTCUSDT"].to_numpy(), sizes)
+
+
+def test_write(tmp_path):
+    step_recorder = recorder(num_steps=5)
+    step_recorder.write(str(tmp_path / "ledger.parquet"))
+    step_recorder.write(str(tmp_path / "ledger.arrow"))
+
+    expected = step_recorder.to_dataframe()
+    pandas.testing.assert_frame_equal(pandas.read_parquet(tmp_path / "ledger.parquet"), expected,
+                                      check_dtype=False, check_categorical=False)
+    pandas.testing.assert_frame_equal(pandas.read_feather(tmp_path / "ledger.arrow"), expected,
+                                      check_dtype=False, check_categorical=False)
@@ -0,0 +1,71 @@
+import sys
+import multiprocessing
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy
+import pytest
+
+import market_simulator
+from market_simulator.engine import Simulator
+
+# The env wrappers live with the agent, next to the package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "agent"))
+from agents.env_wrapper.subproc_vector_env import SubprocVectorEnv  # noqa: E402
+
+ENV_CONFIG = {"num_weeks_train": 10, "evaluation": 1, "show_trade_result": 0}
+# One action per environment, the all-cash action 0 would never end an episode early
+ACTIONS = numpy.array([3, 9, 14, 23])
+
+
+@pytest.fixture(autouse=True)
+def package_path(monkeypatch):
+    # Spawned workers import Simulator by name with the parent's sys.path, where
+    # pytest puts the repository root and its market_simulator directory first
+    monkeypatch.syspath_prepend(str(Path(market_simulator.__file__).resolve().parents[1]))
+
+def test_matches_direct_simulators(klines):
+    simulators = [Simulator(ENV_CONFIG) for _ in ACTIONS]
+    expected_obs = [simulator.reset(0.1) for simulator in simulators]
+
+    with SubprocVectorEnv(Simulator, ENV_CONFIG, num_workers=2, envs_per_worker=2) as vector_env:
+        obs = vector_env.reset()
+        shm_name = vector_env._shm_.name
+        num_done = 0
+
+        for _ in range(60):
+            obs_, rewards, dones, infos = vector_env.step(ACTIONS)
+
+            for i, simulator in enumerate(simulators):
+                expected, reward, done, _ = simulator.step(ACTIONS[i])
+                assert rewards[i] == reward
+                assert dones[i] == done
+
+                if done:
+                    # The worker resets finished episodes
+                    numpy.testing.assert_array_equal(infos[i]["terminal_observation"],
+                                                     expected["observations"])
+                    expected = simulator.reset(0.1)
+                    num_done += 1
+                else:
+                    assert "terminal_observation" not in infos[i]
+
+                numpy.testing.assert_array_equal(obs_["observations"][i], expected["observations"])
+                numpy.testing.assert_array_equal(obs_["action_mask"][i], expected["action_mask"])
+
+        for i in range(len(ACTIONS)):
+            numpy.testing.assert_array_equal(obs["observations"][i], expected_obs[i]["observations"])
+        assert num_done >= len(ACTIONS)
+        assert vector_env.stats()["num_steps"] == 60 * len(ACTIONS)
+
+    # The shared block is unlinked with the env
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=shm_name)
+
+
+def test_failed_worker_closes_the_others(klines):
+    # Simulator raises KeyError without num_weeks_train
+    with pytest.raises(EOFError):
+        SubprocVectorEnv(Simulator, {}, num_workers=2, envs_per_worker=2)
+
+    assert multiprocessing.active_children() == []